@@ -1,62 +1,309 @@
 """farmCalculator API —— FastAPI + MCP 端点"""
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import List, Literal, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from fastapi_mcp import FastApiMCP
 
-from models import CROPS, SOILS, MEALS
-from calculator import calculate_farmland
+import json_codec
+import metrics
+import tasks
+from models import CROPS, SOILS, MEALS, YEAR_DAYS, MAX_POPULATION, MAX_TILES, data_fingerprint
+from models import CROPS_BY_ID, SOILS_BY_ID
+from calculator import calculate_farmland, crop_yield, max_population
+from calculator import layout_dimensions
+from worker_pool import BoundedProcessPool, PoolSaturated, PoolUnavailable
+from batch_io import chunked
+from response_cache import ResponseCache
+from json_codec import CalculateResponse
+
+# 预计算结果表：设置 FARM_PRECOMPUTE=1（或 python api.py --precompute）时启动加载
+result_table = None
+
+# 目录数据很少变化：允许客户端缓存一分钟，之后用 ETag 重新验证
+CATALOG_CACHE_CONTROL = "public, max-age=60"
+SWEEP_CHUNK_SIZE = 500  # 流式扫描每次计算并发送的行数
+SWEEP_RETRY_DELAY = 0.05  # 流式扫描遇到进程池满载时的等待时间（秒）
+
+# 批量等重计算交给进程池，轻量端点直接在事件循环中返回
+worker_pool = BoundedProcessPool()
+
+# 相同计算请求的已序列化响应（FARM_RESPONSE_CACHE_SIZE=0 时关闭）
+response_cache = ResponseCache.from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global result_table
+    if os.environ.get("FARM_PRECOMPUTE") == "1":
+        from result_table import ResultTable
+        result_table = ResultTable.load_or_build()
+    yield
+    result_table = None
+    worker_pool.shutdown()
 
 
 app = FastAPI(
     title="边缘世界农场计算器 API",
     description="RimWorld 农场规划工具——计算种植面积、布局和餐饮产出",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+if metrics.ENABLED:
+    app.middleware("http")(metrics.timing_middleware)
+
+if os.environ.get("FARM_PROFILE") == "1":
+    import profiling
+    profiling.install()
+
 
 class CalculateRequest(BaseModel):
-    crop_id: int = Field(..., ge=1, le=3, description="作物ID: 1=土豆, 2=玉米, 3=水稻")
-    soil_id: int = Field(..., ge=1, le=4, description="土地ID: 1=沙砾, 2=普通, 3=肥沃, 4=水培")
-    population: int = Field(..., ge=1, le=1000, description="殖民者数量")
-    growing_days: int = Field(..., ge=1, le=60, description="生长期天数（游戏年天数，默认60）")
+    crop_id: int = Field(..., ge=1, le=max(CROPS_BY_ID), description="作物ID: " + ", ".join(
+        f"{c.id}={c.name}" for c in CROPS))
+    soil_id: int = Field(..., ge=1, le=max(SOILS_BY_ID), description="土地ID: " + ", ".join(
+        f"{s.id}={s.name}" for s in SOILS))
+    population: int = Field(..., ge=1, le=MAX_POPULATION, description="殖民者数量")
+    growing_days: int = Field(..., ge=1, le=YEAR_DAYS, description="生长期天数（游戏年天数，默认60）")
+
+
+class OptimizeRequest(BaseModel):
+    population: int = Field(..., ge=1, le=MAX_POPULATION, description="殖民者数量")
+    growing_days: int = Field(..., ge=1, le=YEAR_DAYS, description="生长期天数（游戏年天数，默认60）")
+    rank_by: Literal["tiles", "surplus", "score"] = Field(
+        "tiles", description="排序方式: tiles=所需格数最少, surplus=餐饮盈余最多, score=加权得分最低")
+    meal: Optional[str] = Field(None, description="计算盈余所用的餐饮类型，默认为第一种: " + ", ".join(MEALS))
+    tiles_weight: float = Field(1.0, ge=0, description="加权得分中格数（相对最少格数）的权重")
+    surplus_weight: float = Field(1.0, ge=0, description="加权得分中盈余（相对殖民者数量）的权重")
+
+
+class SoilBudget(BaseModel):
+    soil_id: int = Field(..., ge=1, le=max(SOILS_BY_ID), description="土地ID")
+    tiles: int = Field(..., ge=0, description="该土地可用的格数")
+
+
+class PortfolioRequest(BaseModel):
+    budgets: List[SoilBudget] = Field(..., min_length=1, description="每种土地的可用格数")
+    population: int = Field(..., ge=1, le=MAX_POPULATION, description="殖民者数量")
+    growing_days: int = Field(..., ge=1, le=YEAR_DAYS, description="生长期天数（游戏年天数，默认60）")
+    objective: Literal["min_tiles", "max_yield"] = Field(
+        "min_tiles", description="优化目标: min_tiles=满足需求的最少格数, max_yield=用满格数的最大产量")
+
+
+class BatchCalculateItem(BaseModel):
+    """批量计算的单项——不设范围约束，越界的项在结果中内联报错，不拒绝整批"""
+    crop_id: int = Field(..., description="作物ID")
+    soil_id: int = Field(..., description="土地ID")
+    population: int = Field(..., description=f"殖民者数量（1–{MAX_POPULATION}）")
+    growing_days: int = Field(..., description=f"生长期天数（1–{YEAR_DAYS}）")
+
+
+class BatchCalculateRequest(BaseModel):
+    items: List[BatchCalculateItem] = Field(
+        ..., min_length=1, max_length=10000, description="计算场景列表，最多10000个"
+    )
+
+
+class MaxPopulationRequest(BaseModel):
+    crop_id: int = Field(..., ge=1, le=max(CROPS_BY_ID), description="作物ID")
+    soil_id: int = Field(..., ge=1, le=max(SOILS_BY_ID), description="土地ID")
+    tiles: int = Field(..., ge=0, le=MAX_TILES, description="可用的种植格数")
+    growing_days: int = Field(..., ge=1, le=YEAR_DAYS, description="生长期天数（游戏年天数，默认60）")
+
+
+class BatchMaxPopulationItem(BaseModel):
+    """批量反向查询的单项——不设范围约束，越界的项在结果中内联报错，不拒绝整批"""
+    crop_id: int = Field(..., description="作物ID")
+    soil_id: int = Field(..., description="土地ID")
+    tiles: int = Field(..., description=f"可用的种植格数（0–{MAX_TILES}）")
+    growing_days: int = Field(..., description=f"生长期天数（1–{YEAR_DAYS}）")
+
+
+class BatchMaxPopulationRequest(BaseModel):
+    items: List[BatchMaxPopulationItem] = Field(
+        ..., min_length=1, max_length=10000, description="查询列表，最多10000个"
+    )
+
+
+class SweepRequest(BaseModel):
+    crop_id: int = Field(..., ge=1, le=max(CROPS_BY_ID), description="作物ID")
+    soil_id: int = Field(..., ge=1, le=max(SOILS_BY_ID), description="土地ID")
+    population_min: int = Field(1, ge=1, le=MAX_POPULATION, description="殖民者数量下限")
+    population_max: int = Field(MAX_POPULATION, ge=1, le=MAX_POPULATION, description="殖民者数量上限")
+    growing_days_min: int = Field(YEAR_DAYS, ge=1, le=YEAR_DAYS, description="生长期天数下限")
+    growing_days_max: int = Field(YEAR_DAYS, ge=1, le=YEAR_DAYS, description="生长期天数上限")
+    format: Literal["ndjson", "sse"] = Field("ndjson", description="ndjson=每行一个JSON, sse=server-sent events")
+
+
+def _json_response(content) -> Response:
+    """直接编码响应模型，不经过 jsonable_encoder"""
+    return Response(content=json_codec.dumps(content), media_type="application/json")
+
+
+async def _run_in_pool(fn, *args):
+    """在进程池中执行 fn(*args)；满载时返回 429，子进程异常退出时返回 503"""
+    try:
+        return await worker_pool.run(fn, *args)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except PoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+@lru_cache(maxsize=8)
+def _catalog_body(kind: str, fingerprint: str) -> Tuple[bytes, str]:
+    """按数据版本序列化目录，返回 (JSON字节, 强ETag)；数据不变时只序列化一次"""
+    if kind == "crops":
+        catalog = [
+            {
+                "id": c.id,
+                "name": c.name,
+                "fertility_sensitivity": c.fertility_sensitivity,
+                "base_yield": c.base_yield,
+                "supported_soils": [
+                    soil_name for soil_name, days in c.growth_days.items() if days is not None
+                ],
+            }
+            for c in CROPS
+        ]
+    else:
+        catalog = [
+            {"id": s.id, "name": s.name, "display": s.display, "fertility": s.fertility}
+            for s in SOILS
+        ]
+
+    body = json_codec.dumps(catalog)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return body, etag
+
+
+def _catalog_response(request: Request, kind: str) -> Response:
+    """返回目录，客户端 If-None-Match 命中时返回 304"""
+    body, etag = _catalog_body(kind, data_fingerprint())
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or etag in tags:
+            metrics.record_cache("catalog_etag", True)
+            return Response(status_code=304, headers=headers)
+    metrics.record_cache("catalog_etag", False)
+
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/api/crops")
-def list_crops():
+async def list_crops(request: Request):
     """列出所有可用作物及其属性"""
-    return [
-        {
-            "id": c.id,
-            "name": c.name,
-            "fertility_sensitivity": c.fertility_sensitivity,
-            "base_yield": c.base_yield,
-            "supported_soils": [
-                soil_name for soil_name, days in c.growth_days.items() if days is not None
-            ],
-        }
-        for c in CROPS
-    ]
+    return _catalog_response(request, "crops")
 
 
 @app.get("/api/soils")
-def list_soils():
+async def list_soils(request: Request):
     """列出所有土地类型及其肥力"""
-    return [
-        {"id": s.id, "name": s.name, "display": s.display, "fertility": s.fertility}
-        for s in SOILS
-    ]
+    return _catalog_response(request, "soils")
 
 
 @app.post("/api/calculate")
-def api_calculate(req: CalculateRequest):
+async def api_calculate(req: CalculateRequest):
     """
     计算农场需求。
 
     根据殖民者数量、作物类型、土地类型和生长期，
     返回所需种植格数、最佳布局、年产量和餐饮供养能力。
     """
-    crop = next((c for c in CROPS if c.id == req.crop_id), None)
-    soil = next((s for s in SOILS if s.id == req.soil_id), None)
+    crop = CROPS_BY_ID.get(req.crop_id)
+    soil = SOILS_BY_ID.get(req.soil_id)
+
+    if crop is None:
+        raise HTTPException(status_code=404, detail=f"作物ID {req.crop_id} 不存在")
+    if soil is None:
+        raise HTTPException(status_code=404, detail=f"土地ID {req.soil_id} 不存在")
+
+    cache_key = None
+    if response_cache is not None:
+        cache_key = response_cache.key(req.crop_id, req.soil_id, req.population, req.growing_days)
+        body = await response_cache.get_async(cache_key)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+    result = None
+    if result_table is not None:
+        result = result_table.lookup(crop, soil, req.population, req.growing_days)
+        metrics.record_cache("result_table", result is not None)
+
+    if result is None:
+        try:
+            result = calculate_farmland(crop, soil, req.population, req.growing_days)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        metrics.record_calculation(crop.name, soil.display)
+    else:
+        metrics.record_calculation(crop.name, soil.display, "table")
+
+    body = json_codec.dumps(CalculateResponse.from_result(result))
+    if cache_key is not None:
+        await response_cache.set_async(cache_key, body)
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/api/optimize")
+async def api_optimize(req: OptimizeRequest):
+    """
+    寻找最合适的作物和土地。
+
+    对所有可种植的作物/土地组合计算农场需求，按所需格数、餐饮盈余
+    或加权得分排序返回。不能在该生长期内种植的组合会被排除。
+    """
+    try:
+        body = await _run_in_pool(
+            tasks.optimize_body, req.population, req.growing_days, req.rank_by,
+            req.meal, req.tiles_weight, req.surplus_weight)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/api/portfolio")
+async def api_portfolio(req: PortfolioRequest):
+    """
+    规划混合种植方案。
+
+    给定每种土地的可用格数和殖民者数量，计算每种土地上种什么作物、
+    种多少格：最少格数满足营养需求（含5%冗余），或用满格数使产量最大。
+    """
+    budgets = {}
+    for budget in req.budgets:
+        if budget.soil_id in budgets:
+            raise HTTPException(status_code=400, detail=f"土地ID {budget.soil_id} 重复")
+        budgets[budget.soil_id] = budget.tiles
+
+    try:
+        body = await _run_in_pool(
+            tasks.portfolio_body, budgets, req.population, req.growing_days, req.objective)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/api/max-population")
+async def api_max_population(req: MaxPopulationRequest):
+    """
+    计算给定格数最多能养活多少殖民者（/api/calculate 的反向查询）。
+
+    返回最大殖民者数量，以及按 /api/calculate 计算该人数实际需要的格数。
+    """
+    crop = CROPS_BY_ID.get(req.crop_id)
+    soil = SOILS_BY_ID.get(req.soil_id)
 
     if crop is None:
         raise HTTPException(status_code=404, detail=f"作物ID {req.crop_id} 不存在")
@@ -64,26 +311,126 @@ def api_calculate(req: CalculateRequest):
         raise HTTPException(status_code=404, detail=f"土地ID {req.soil_id} 不存在")
 
     try:
-        result = calculate_farmland(crop, soil, req.population, req.growing_days)
+        population = max_population(crop, soil, req.tiles, req.growing_days)
+        _, annual_yield = crop_yield(crop, soil, req.growing_days)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return {
-        "crop_name": result.crop_name,
-        "soil_name": result.soil_name,
-        "tiles": result.tiles,
-        "harvests": result.harvests,
-        "layout": result.layout,
-        "annual_yield": round(result.annual_yield, 1),
-        "meal_data": result.meal_data,
-    }
+    return _json_response(tasks.max_population_result(
+        req.crop_id, req.soil_id, req.tiles, req.growing_days, population, annual_yield))
+
+
+@app.post("/api/max-population/batch")
+async def api_max_population_batch(req: BatchMaxPopulationRequest):
+    """
+    批量计算给定格数最多能养活多少殖民者。
+
+    按提交顺序返回结果，每项为 {"result": ..., "error": null} 或
+    {"result": null, "error": "原因"}，单项失败不影响其他查询。
+    计算在进程池中执行，满载时返回 429。
+    """
+    items = [
+        (item.crop_id, item.soil_id, item.tiles, item.growing_days)
+        for item in req.items
+    ]
+    results = await _run_in_pool(tasks.max_population_items, items)
+
+    return _json_response({"results": results})
+
+
+@app.post("/api/sweep/stream", operation_id="sweep_stream")
+async def api_sweep_stream(req: SweepRequest, request: Request):
+    """
+    流式扫描一个作物/土地组合在人数和生长期范围内的全部结果。
+
+    按人数、生长期的顺序逐块计算并立即发送，每行为
+    {"population", "growing_days", "result", "error"}，result 与 /api/calculate 相同。
+    sse 格式最后发送一个 end 事件。客户端断开后停止计算。
+    各块在进程池中计算和编码；开始时进程池已满返回 429，
+    流开始后遇到满载则等待，不中断已开始的响应；子进程异常退出时中断响应。
+    """
+    if req.crop_id not in CROPS_BY_ID:
+        raise HTTPException(status_code=404, detail=f"作物ID {req.crop_id} 不存在")
+    if req.soil_id not in SOILS_BY_ID:
+        raise HTTPException(status_code=404, detail=f"土地ID {req.soil_id} 不存在")
+    if req.population_min > req.population_max or req.growing_days_min > req.growing_days_max:
+        raise HTTPException(status_code=400, detail="范围下限不能大于上限")
+
+    def scenarios():
+        for population in range(req.population_min, req.population_max + 1):
+            for growing_days in range(req.growing_days_min, req.growing_days_max + 1):
+                yield req.crop_id, req.soil_id, population, growing_days
+
+    if worker_pool.saturated:
+        raise HTTPException(status_code=429, detail="进程池已满，请稍后重试",
+                            headers={"Retry-After": "1"})
+
+    sse = req.format == "sse"
 
+    async def rows():
+        sent = 0
+        for chunk in chunked(scenarios(), SWEEP_CHUNK_SIZE):
+            if await request.is_disconnected():
+                return
+            while True:
+                try:
+                    lines = await worker_pool.run(tasks.sweep_lines, chunk, sse)
+                    break
+                except PoolSaturated:
+                    await asyncio.sleep(SWEEP_RETRY_DELAY)
+            sent += len(chunk)
+            yield lines
+        if sse:
+            yield b"event: end\ndata: " + json_codec.dumps({"rows": sent}) + b"\n\n"
 
-# 挂载 MCP —— 所有端点自动暴露为 MCP tools
-mcp = FastApiMCP(app)
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/api/calculate/batch")
+async def api_calculate_batch(req: BatchCalculateRequest):
+    """
+    批量计算农场需求。
+
+    一次提交多个计算场景，按提交顺序返回结果。每项为
+    {"result": ..., "error": null} 或 {"result": null, "error": "原因"}，
+    单项失败不影响其他场景。计算在进程池中执行，满载时返回 429。
+    """
+    items = [
+        (item.crop_id, item.soil_id, item.population, item.growing_days)
+        for item in req.items
+    ]
+    results = await _run_in_pool(tasks.calculate_batch, items)
+
+    return _json_response({"results": results})
+
+
+if metrics.ENABLED:
+    metrics.register_lru_cache("layout_dimensions", layout_dimensions)
+    metrics.register_lru_cache("catalog_body", _catalog_body)
+    if response_cache is not None:
+        metrics.register_lru_cache("calculate_response", response_cache)
+
+    # 不进入 OpenAPI 文档，因此也不会暴露为 MCP tool
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return Response(content=metrics.render(),
+                        media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# 挂载 MCP —— 其余端点自动暴露为 MCP tools；流式端点无法作为单个工具返回值使用，不暴露
+mcp = FastApiMCP(app, exclude_operations=["sweep_stream"])
 mcp.mount()
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
+
+    if "--precompute" in sys.argv[1:]:
+        os.environ["FARM_PRECOMPUTE"] = "1"
+    if "--profile" in sys.argv[1:]:
+        import profiling
+        profiling.install()
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,155 @@
+"""非交互批量模式——从 CSV/JSONL 流式读入场景，逐行写出计算结果
+
+整个流程由生成器串联：读入 → 分块 → 计算 → 写出，任何时刻只保留
+少量分块在内存中，输入行数再多内存占用也不变。
+"""
+import csv
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterable, Iterator, List, Tuple
+
+from models import MEALS
+import profiling
+import tasks
+
+FORMATS = ("csv", "jsonl")
+INPUT_FIELDS = ("crop_id", "soil_id", "population", "growing_days")
+RESULT_FIELDS = (
+    "crop_name", "soil_name", "tiles", "harvests", "layout",
+    "width", "height", "padding_tiles", "annual_yield",
+)
+MEAL_FIELDS = ("total_meals", "daily_meals", "supported_people")
+DEFAULT_CHUNK_SIZE = 10000
+
+Scenario = Tuple[int, int, int, int]
+
+
+def guess_format(path: str, default: str = "csv") -> str:
+    """按扩展名推断文件格式，无法推断时返回 default"""
+    if path and path != "-":
+        for fmt in FORMATS:
+            if path.lower().endswith("." + fmt):
+                return fmt
+        if path.lower().endswith(".ndjson"):
+            return "jsonl"
+    return default
+
+
+def read_scenarios(stream: IO[str], fmt: str) -> Iterator[Scenario]:
+    """逐行解析输入，产出 (crop_id, soil_id, population, growing_days)；格式错误时抛出 ValueError"""
+    if fmt == "csv":
+        rows = csv.DictReader(stream)
+        missing = set(INPUT_FIELDS) - set(rows.fieldnames or ())
+        if missing:
+            raise ValueError(f"CSV 缺少列: {', '.join(sorted(missing))}")
+        start = 2  # 第1行是表头
+    else:
+        rows = (json.loads(line) for line in stream if line.strip())
+        start = 1
+
+    for line_no, row in enumerate(rows, start):
+        try:
+            yield tuple(int(row[field]) for field in INPUT_FIELDS)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"第{line_no}行格式错误: {row!r}") from e
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """把迭代器切成长度不超过 size 的列表"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def calculate_chunks(chunks: Iterable[List[Scenario]], jobs: int = 1
+                     ) -> Iterator[Tuple[List[Scenario], List[dict]]]:
+    """
+    逐块计算，按输入顺序产出 (场景列表, 结果列表)。
+
+    jobs > 1 时分发到进程池，同时在途的分块不超过 jobs × 2，
+    既能让所有进程保持忙碌，又不会把整个输入读进内存。
+    开启了剖析时子进程同样剖析，各自退出时写出结果。
+    """
+    if jobs <= 1:
+        for chunk in chunks:
+            yield chunk, tasks.calculate_batch(chunk)
+        return
+
+    initializer, initargs = profiling.worker_initializer()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer,
+                             initargs=initargs) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append((chunk, executor.submit(tasks.calculate_batch, chunk)))
+            if len(in_flight) >= jobs * 2:
+                done_chunk, future = in_flight.popleft()
+                yield done_chunk, future.result()
+        while in_flight:
+            done_chunk, future = in_flight.popleft()
+            yield done_chunk, future.result()
+
+
+def _csv_header() -> List[str]:
+    header = list(INPUT_FIELDS) + ["error"] + list(RESULT_FIELDS)
+    for meal_name in MEALS:
+        header += [f"{meal_name}_{field}" for field in MEAL_FIELDS]
+    return header
+
+
+def _csv_row(scenario: Scenario, item: dict) -> list:
+    result = item["result"]
+    if result is None:
+        blanks = len(RESULT_FIELDS) + len(MEALS) * len(MEAL_FIELDS)
+        return list(scenario) + [item["error"]] + [""] * blanks
+
+    row = list(scenario) + [""] + [result[field] for field in RESULT_FIELDS]
+    for meal_name in MEALS:
+        row += [result["meal_data"][meal_name][field] for field in MEAL_FIELDS]
+    return row
+
+
+def write_results(results: Iterable[Tuple[List[Scenario], List[dict]]],
+                  stream: IO[str], fmt: str) -> int:
+    """把计算结果逐行写出，返回写出的行数"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(_csv_header())
+        for chunk, items in results:
+            writer.writerows(_csv_row(s, item) for s, item in zip(chunk, items))
+            count += len(chunk)
+    else:
+        for chunk, items in results:
+            for scenario, item in zip(chunk, items):
+                record = dict(zip(INPUT_FIELDS, scenario))
+                record.update(item)
+                stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += len(chunk)
+    return count
+
+
+def run_batch(input_path: str = "-", output_path: str = "-", input_format: str = None,
+              output_format: str = None, jobs: int = 1,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """批量模式入口，"-" 表示标准输入/输出；返回处理的行数"""
+    input_format = input_format or guess_format(input_path)
+    output_format = output_format or guess_format(output_path, input_format)
+
+    source = sys.stdin if input_path == "-" else open(input_path, newline="", encoding="utf-8")
+    target = sys.stdout if output_path == "-" else open(output_path, "w", newline="", encoding="utf-8")
+    try:
+        scenarios = read_scenarios(source, input_format)
+        results = calculate_chunks(chunked(scenarios, chunk_size), jobs)
+        return write_results(results, target, output_format)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
@@ -0,0 +1,111 @@
+"""API 压测——在本地启动多 worker 的 uvicorn，测量各端点的吞吐、延迟和 429 比例
+
+用法（需要 httpx）：
+    python benchmarks/bench_api_load.py --workers 4 --concurrency 64 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def random_item():
+    return {
+        "crop_id": random.randint(1, 3),
+        "soil_id": random.randint(1, 4),
+        "population": random.randint(1, 1000),
+        "growing_days": random.randint(1, 60),
+    }
+
+
+SCENARIOS = {
+    "GET /api/crops": lambda: ("GET", "/api/crops", None),
+    "POST /api/calculate": lambda: ("POST", "/api/calculate", random_item()),
+    "POST /api/calculate/batch (1000)": lambda: (
+        "POST", "/api/calculate/batch", {"items": [random_item() for _ in range(1000)]}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, workers):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+        # 让每个 worker 的进程池按 worker 数均分 CPU 核
+        env={**os.environ, "WEB_CONCURRENCY": str(workers)},
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/soils").status_code == 200:
+                return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn 启动超时")
+
+
+async def run_scenario(base_url, make_request, total, concurrency):
+    latencies, statuses = [], {}
+    remaining = iter(range(total))
+
+    async def worker(client):
+        for _ in remaining:
+            method, path, body = make_request()
+            start = time.perf_counter()
+            resp = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker 进程数")
+    parser.add_argument("--concurrency", type=int, default=64, help="并发连接数")
+    parser.add_argument("--requests", type=int, default=2000, help="每个场景的请求数")
+    args = parser.parse_args()
+
+    port = free_port()
+    proc = start_server(port, args.workers)
+    try:
+        for name, make_request in SCENARIOS.items():
+            total = args.requests if "batch" not in name else max(args.requests // 20, 1)
+            stats = asyncio.run(run_scenario(
+                f"http://127.0.0.1:{port}", make_request, total, args.concurrency))
+            print(f"{name:34s} {stats['rps']:9.1f} req/s  p50 {stats['p50_ms']:7.2f} ms  "
+                  f"p99 {stats['p99_ms']:7.2f} ms  {stats['statuses']}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
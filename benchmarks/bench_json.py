@@ -0,0 +1,166 @@
+"""JSON 响应编码对比——FastAPI 默认路径（jsonable_encoder + json）与 json_codec 各后端的每秒请求数
+
+在进程内直接调用 ASGI 应用，不经过网络和 HTTP 服务器，只比较框架 + 计算 + 编码的 CPU 开销。
+用法：
+    python benchmarks/bench_json.py --requests 5000
+未安装的后端（msgspec / orjson）会跳过。
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Response  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import json_codec  # noqa: E402
+from api import CalculateRequest, OptimizeRequest  # noqa: E402
+from calculator import calculate_farmland, rank_farmland  # noqa: E402
+from json_codec import CalculateResponse, OptimizeOption, OptimizeResponse  # noqa: E402
+from models import CROPS_BY_ID, SOILS_BY_ID  # noqa: E402
+
+SCENARIOS = {
+    "POST /api/calculate": (
+        "calculate", {"crop_id": 1, "soil_id": 2, "population": 500, "growing_days": 60}),
+    "POST /api/optimize": (
+        "optimize", {"population": 500, "growing_days": 60, "rank_by": "tiles"}),
+}
+
+
+def build_app(dumps=None) -> FastAPI:
+    """与 api.py 相同的两个端点；dumps 为 None 时按改动前的写法返回 dict"""
+    app = FastAPI()
+
+    @app.post("/calculate")
+    async def calculate(req: CalculateRequest):
+        result = calculate_farmland(CROPS_BY_ID[req.crop_id], SOILS_BY_ID[req.soil_id],
+                                    req.population, req.growing_days)
+        if dumps is None:
+            return result.to_dict()
+        return Response(content=dumps(CalculateResponse.from_result(result)),
+                        media_type="application/json")
+
+    @app.post("/optimize")
+    async def optimize(req: OptimizeRequest):
+        options = rank_farmland(req.population, req.growing_days, req.rank_by,
+                                req.meal, req.tiles_weight, req.surplus_weight)
+        if dumps is None:
+            return {
+                "rank_by": req.rank_by,
+                "options": [
+                    {
+                        "crop_id": option.crop_id,
+                        "soil_id": option.soil_id,
+                        "surplus": option.surplus,
+                        "score": round(option.score, 4),
+                        "result": option.result.to_dict(),
+                    }
+                    for option in options
+                ],
+            }
+        return Response(content=dumps(OptimizeResponse(
+            req.rank_by, [OptimizeOption.from_option(option) for option in options])),
+            media_type="application/json")
+
+    return app
+
+
+async def call(app, path: str, body: bytes) -> bytes:
+    """直接调用 ASGI 应用，返回响应体"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+    }
+    received = False
+    chunks = []
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} 返回 {message['status']}")
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+async def requests_per_second(app, path: str, body: bytes, total: int) -> float:
+    start = time.perf_counter()
+    for _ in range(total):
+        await call(app, path, body)
+    return total / (time.perf_counter() - start)
+
+
+def encode_time(fn, obj, number=2000) -> float:
+    """单次编码耗时（微秒），取 3 轮最小值"""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(obj)
+        timings.append((time.perf_counter() - start) / number * 1e6)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000, help="每个场景每轮的请求数")
+    parser.add_argument("--repeat", type=int, default=3, help="轮数，取中位数")
+    args = parser.parse_args()
+
+    variants = {"默认 (jsonable_encoder)": None}
+    for backend in json_codec.BACKENDS:
+        try:
+            variants[backend] = json_codec.encoder(backend)
+        except ImportError:
+            print(f"跳过 {backend}：未安装")
+    apps = {name: build_app(dumps) for name, dumps in variants.items()}
+
+    for scenario, (path, payload) in SCENARIOS.items():
+        body = json.dumps(payload).encode()
+        # 各后端输出必须与默认路径逐字节一致
+        expected = asyncio.run(call(apps["默认 (jsonable_encoder)"], "/" + path, body))
+        for name, app in apps.items():
+            if asyncio.run(call(app, "/" + path, body)) != expected:
+                sys.exit(f"{name} 的输出与默认路径不一致: {scenario}")
+
+        print(f"\n[{scenario}]  响应 {len(expected)} 字节")
+        baseline = None
+        for name, app in apps.items():
+            rps = statistics.median(
+                asyncio.run(requests_per_second(app, "/" + path, body, args.requests))
+                for _ in range(args.repeat))
+            baseline = baseline or rps
+            print(f"  {name:26s} {rps:10.0f} req/s  {rps / baseline:5.2f}x")
+
+    # 只看编码本身：calculate 响应
+    result = calculate_farmland(CROPS_BY_ID[1], SOILS_BY_ID[2], 500, 60)
+    print("\n[编码单个 /api/calculate 响应]")
+    default_us = encode_time(
+        lambda r: json.dumps(jsonable_encoder(r.to_dict()), ensure_ascii=False, allow_nan=False,
+                             separators=(",", ":")).encode("utf-8"), result)
+    print(f"  {'默认 (jsonable_encoder)':26s} {default_us:10.2f} µs")
+    for name, dumps in variants.items():
+        if dumps is not None:
+            us = encode_time(lambda r, dumps=dumps: dumps(CalculateResponse.from_result(r)), result)
+            print(f"  {name:26s} {us:10.2f} µs  {default_us / us:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""内存对比——每百万个结果用 FarmResult 列表和列式 FarmBatchResult 分别占用多少内存
+
+用法：
+    python benchmarks/bench_memory.py [--sample 100000]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculator import calculate_farmland_batch  # noqa: E402
+
+MILLION = 1_000_000
+
+
+def random_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(1, 4, n),
+        rng.integers(1, 5, n),
+        rng.integers(1, 1001, n),
+        rng.integers(30, 61, n),
+    )
+
+
+def measure(build):
+    """返回 build() 的结果在 tracemalloc 中新增的内存（字节）"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sample", type=int, default=100_000,
+                        help="FarmResult 列表的采样数量，结果按比例换算到百万")
+    args = parser.parse_args()
+
+    batch = calculate_farmland_batch(*random_scenarios(MILLION))
+    columnar = batch.nbytes
+
+    sample = calculate_farmland_batch(*random_scenarios(args.sample, seed=1))
+    results, listed = measure(lambda: [r for r in sample.iter_results() if r is not None])
+    per_million = listed / len(results) * MILLION
+
+    print(f"FarmBatchResult（列式）: {columnar / 2**20:8.1f} MiB / 百万结果")
+    print(f"list[FarmResult]       : {per_million / 2**20:8.1f} MiB / 百万结果"
+          f"（按 {len(results)} 个有效结果换算）")
+    print(f"节省                   : {per_million / columnar:8.1f} 倍")
+
+
+if __name__ == "__main__":
+    main()
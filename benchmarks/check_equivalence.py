@@ -0,0 +1,140 @@
+"""一致性检查——快速实现必须与参照实现的结果完全一致
+
+- 向量化 calculate_farmland_batch 与标量 calculate_farmland 逐位一致
+- 窗口搜索的 layout_dimensions 与原先的全量扫描一致
+- 各土地格数充足时，plan_portfolio 的最少格数等于 calculate_farmland 的最优单一方案
+
+用法：
+    python benchmarks/check_equivalence.py --samples 20000 --seed 0
+在固定种子的随机参数网格（含不存在的 ID 和生长期不足的组合）上比较，
+不一致时打印前几个差异并以非零状态退出。
+"""
+import argparse
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import CROPS, SOILS, CROPS_BY_ID, SOILS_BY_ID, MAX_POPULATION, YEAR_DAYS  # noqa: E402
+from calculator import (  # noqa: E402
+    calculate_farmland, calculate_farmland_batch, layout_dimensions, plan_portfolio, viable_pairs,
+)
+
+MAX_REPORTED = 5
+LAYOUT_CONTIGUOUS = 5000  # 逐一检查的格数范围 0..LAYOUT_CONTIGUOUS
+LAYOUT_MAX_TILES = 10_000_000  # 随机抽查的格数上限
+
+
+def check_batch(samples: int, seed: int) -> int:
+    """calculate_farmland_batch 与 calculate_farmland 比较，返回不一致的行数"""
+    rng = random.Random(seed)
+    crop_ids = [c.id for c in CROPS] + [0, max(CROPS_BY_ID) + 1]
+    soil_ids = [s.id for s in SOILS] + [0, max(SOILS_BY_ID) + 1]
+    scenarios = [
+        (rng.choice(crop_ids), rng.choice(soil_ids),
+         rng.randint(1, MAX_POPULATION * 100), rng.randint(1, YEAR_DAYS))
+        for _ in range(samples)
+    ]
+
+    batch = calculate_farmland_batch(*zip(*scenarios))
+    mismatches = 0
+    for (crop_id, soil_id, population, growing_days), got in zip(scenarios, batch):
+        crop, soil = CROPS_BY_ID.get(crop_id), SOILS_BY_ID.get(soil_id)
+        try:
+            expected = calculate_farmland(crop, soil, population, growing_days) \
+                if crop is not None and soil is not None else None
+        except ValueError:
+            expected = None
+        if got != expected:
+            mismatches += 1
+            if mismatches <= MAX_REPORTED:
+                print(f"  不一致 crop={crop_id} soil={soil_id} population={population} "
+                      f"growing_days={growing_days}\n    批量: {got}\n    标量: {expected}")
+    return mismatches
+
+
+def exhaustive_layout(tiles: int):
+    """原先的全量扫描实现，返回 (宽, 高)"""
+    if tiles <= 0:
+        return 0, 0
+
+    best_w, best_h = 1, tiles
+    best_diff = float('inf')
+
+    for w in range(1, min(int(tiles**0.5 * 2), tiles) + 1):
+        h = math.ceil(tiles / w)
+        diff = abs(w - h) + (w * h - tiles) * 0.1
+
+        if diff < best_diff and w * h >= tiles:
+            best_diff, best_w, best_h = diff, w, h
+
+    return best_w, best_h
+
+
+def check_layout(samples: int, seed: int) -> int:
+    """layout_dimensions 与全量扫描比较，返回不一致的格数个数"""
+    rng = random.Random(seed)
+    tiles_list = list(range(LAYOUT_CONTIGUOUS + 1)) + [
+        rng.randint(LAYOUT_CONTIGUOUS, LAYOUT_MAX_TILES) for _ in range(max(samples // 100, 1))
+    ]
+
+    mismatches = 0
+    for tiles in tiles_list:
+        dims = layout_dimensions.__wrapped__(tiles)  # 绕过缓存
+        width, height = exhaustive_layout(tiles)
+        expected = (width, height, width * height - tiles)
+        if (dims.width, dims.height, dims.padding_tiles) != expected:
+            mismatches += 1
+            if mismatches <= MAX_REPORTED:
+                print(f"  不一致 tiles={tiles}: 窗口搜索 {dims}，全量扫描 {expected}")
+    return mismatches
+
+
+def check_portfolio(samples: int, seed: int) -> int:
+    """格数充足时 plan_portfolio 应只种最优的一块土地，格数与 calculate_farmland 相同"""
+    rng = random.Random(seed)
+    budgets = {soil.id: 10 ** 9 for soil in SOILS}
+
+    mismatches = 0
+    for _ in range(max(samples // 4, 1)):
+        population, growing_days = rng.randint(1, MAX_POPULATION), rng.randint(1, YEAR_DAYS)
+        pairs = viable_pairs(growing_days)
+        if not pairs:
+            continue
+        expected = min(calculate_farmland(crop, soil, population, growing_days).tiles
+                       for crop, soil in pairs)
+        plan = plan_portfolio(budgets, population, growing_days, "min_tiles")
+        if plan.total_tiles != expected or not plan.feasible:
+            mismatches += 1
+            if mismatches <= MAX_REPORTED:
+                print(f"  不一致 population={population} growing_days={growing_days}: "
+                      f"组合方案 {plan.total_tiles} 格（feasible={plan.feasible}），"
+                      f"单一方案 {expected} 格")
+    return mismatches
+
+
+CHECKS = {
+    "calculate_farmland_batch": check_batch,
+    "layout_dimensions": check_layout,
+    "plan_portfolio": check_portfolio,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=20000, help="随机场景数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    failed = False
+    for name, check in CHECKS.items():
+        mismatches = check(args.samples, args.seed)
+        print(f"{name:28s} {'通过' if not mismatches else f'{mismatches} 处不一致'}")
+        failed = failed or bool(mismatches)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""基准测试集——计算、布局、API、GUI 渲染各路径的耗时，结果存为 JSON 以便跨提交对比
+
+用法：
+    python benchmarks/run.py -o before.json
+    python benchmarks/run.py -o after.json --compare before.json
+    python benchmarks/run.py --only calculator,layout   # 只跑部分分组
+
+uvicorn 分组需要 httpx；GUI 分组需要图形界面，没有 DISPLAY 时尝试用
+pyvirtualdisplay 启动虚拟显示，都不可用则跳过并在结果中注明原因。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models import CROPS_BY_ID, SOILS_BY_ID, FarmResult  # noqa: E402
+from calculator import calculate_farmland, layout_dimensions, optimal_layout  # noqa: E402
+
+GROUPS = ("calculator", "layout", "testclient", "uvicorn", "gui")
+REGRESSION_THRESHOLD = 1.2  # 比基线慢 20% 以上视为退化
+
+
+def measure(fn, repeat=5, min_time=0.05):
+    """自动确定循环次数，重复 repeat 轮，返回每次调用的耗时统计（秒）"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 10 > min_time else 10
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {"min": min(timings), "median": statistics.median(timings), "number": number}
+
+
+def bench_calculator():
+    crop, soil = CROPS_BY_ID[1], SOILS_BY_ID[2]
+    results = {}
+    for population in (1, 100, 1000, 100_000):
+        # calculate_farmland 内部的布局有缓存，这里每次清空，测量完整路径
+        def run(population=population):
+            layout_dimensions.cache_clear()
+            calculate_farmland(crop, soil, population, 60)
+        results[f"calculate_farmland[population={population}]"] = measure(run)
+    return results
+
+
+def bench_layout():
+    results = {}
+    for tiles in (10, 1_000, 100_000, 10_000_000):
+        results[f"layout_dimensions[tiles={tiles}]"] = measure(
+            lambda tiles=tiles: layout_dimensions.__wrapped__(tiles))
+        optimal_layout(tiles)
+        results[f"optimal_layout_cached[tiles={tiles}]"] = measure(
+            lambda tiles=tiles: optimal_layout(tiles))
+    return results
+
+
+def bench_testclient():
+    from fastapi.testclient import TestClient
+    import api
+
+    body = {"crop_id": 1, "soil_id": 2, "population": 500, "growing_days": 60}
+    results = {}
+    with TestClient(api.app) as client:
+        # 同一请求体会一直命中响应缓存；关掉缓存测量完整路径，与早期基线可比
+        cache, api.response_cache = api.response_cache, None
+        try:
+            results["POST /api/calculate"] = measure(
+                lambda: client.post("/api/calculate", json=body))
+        finally:
+            api.response_cache = cache
+        if cache is not None:
+            results["POST /api/calculate (响应缓存命中)"] = measure(
+                lambda: client.post("/api/calculate", json=body))
+        results["GET /api/crops"] = measure(lambda: client.get("/api/crops"))
+    return results
+
+
+def bench_uvicorn():
+    import asyncio
+    from bench_api_load import SCENARIOS, free_port, run_scenario, start_server
+
+    port = free_port()
+    proc = start_server(port, 1)
+    try:
+        stats = asyncio.run(run_scenario(
+            f"http://127.0.0.1:{port}", SCENARIOS["POST /api/calculate"], 1000, 16))
+    finally:
+        proc.terminate()
+        proc.wait()
+    # 转成与其他分组一致的“每次耗时”，同时保留吞吐和延迟分位
+    return {"POST /api/calculate (uvicorn, 16 并发)": {
+        "min": 1 / stats["rps"], "median": 1 / stats["rps"], "number": 1000,
+        "rps": stats["rps"], "p50_ms": stats["p50_ms"], "p99_ms": stats["p99_ms"],
+    }}
+
+
+def bench_gui():
+    display = None
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        try:
+            from pyvirtualdisplay import Display
+        except ImportError:
+            return {"skipped": "没有 DISPLAY，且未安装 pyvirtualdisplay"}
+        display = Display(visible=False, size=(1280, 1024))
+        display.start()
+
+    try:
+        import tkinter as tk
+        from gui import FarmCalculatorApp, ResultPane
+
+        try:
+            app = FarmCalculatorApp()
+        except tk.TclError as e:
+            return {"skipped": f"无法创建窗口: {e}"}
+
+        results = {}
+        try:
+            frame = tk.Frame(app)
+            frame.pack()
+            pane = ResultPane(app, frame)
+            pane.build()
+
+            for tiles in (100, 400, 10_000, 1_000_000):
+                dims = layout_dimensions(tiles)
+                result = FarmResult(
+                    crop_name="", soil_name="", tiles=tiles, harvests=0,
+                    layout=optimal_layout(tiles), width=dims.width, height=dims.height,
+                    padding_tiles=dims.padding_tiles, annual_yield=0, meal_data={})
+
+                def render(result=result):
+                    pane.layout_key = None  # 强制重绘
+                    pane.update_layout(result)
+                    app.update_idletasks()
+                results[f"layout_render[tiles={tiles}]"] = measure(render, repeat=3)
+
+            # 模拟拖动人口滑块：1 到 1000 人逐一更新结果区域
+            crop, soil = CROPS_BY_ID[1], SOILS_BY_ID[2]
+            drag = [calculate_farmland(crop, soil, p, 60) for p in range(1, 1001)]
+
+            def slide():
+                for population, result in enumerate(drag, 1):
+                    pane.update(result, population)
+                    app.update_idletasks()
+            stats = measure(slide, repeat=3, min_time=0)
+            results["result_pane_update (每步，拖动 1→1000 人)"] = {
+                key: value / len(drag) if key != "number" else value
+                for key, value in stats.items()
+            }
+        finally:
+            app.destroy()
+        return results
+    finally:
+        if display is not None:
+            display.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """打印与基线的对比，返回退化项数量"""
+    regressions = 0
+    print(f"\n对比基线 {baseline.get('commit')}（{baseline.get('timestamp')}）")
+    for group, cases in results["groups"].items():
+        base_cases = baseline.get("groups", {}).get(group, {})
+        for name, stats in cases.items():
+            base = base_cases.get(name)
+            if not isinstance(stats, dict) or not isinstance(base, dict):
+                continue
+            ratio = stats["min"] / base["min"]
+            flag = ""
+            if ratio > REGRESSION_THRESHOLD:
+                flag = "  <-- 退化"
+                regressions += 1
+            print(f"  {group:10s} {name:50s} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之对比的基线 JSON 文件")
+    parser.add_argument("--only", help="只运行的分组，逗号分隔: " + ",".join(GROUPS))
+    args = parser.parse_args()
+
+    groups = args.only.split(",") if args.only else GROUPS
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"未知分组: {', '.join(sorted(unknown))}")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "groups": {},
+    }
+    for group in groups:
+        try:
+            cases = globals()[f"bench_{group}"]()
+        except ImportError as e:
+            cases = {"skipped": f"缺少依赖: {e.name}"}
+        results["groups"][group] = cases
+
+        print(f"[{group}]")
+        for name, stats in cases.items():
+            if isinstance(stats, dict):
+                print(f"  {name:50s} {stats['min'] * 1e6:12.1f} µs")
+            else:
+                print(f"  {name}: {stats}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
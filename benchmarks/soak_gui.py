@@ -0,0 +1,124 @@
+"""GUI 长时间运行检查——反复计算、缩放窗口、切换界面，确认事件绑定和回调命令数量不增长
+
+用法（需要图形界面；没有 DISPLAY 时尝试用 pyvirtualdisplay）：
+    python benchmarks/soak_gui.py --iterations 500
+数量增长时以非零状态退出。
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import CROPS, SOILS  # noqa: E402
+
+GLOBAL_SEQUENCES = ("<MouseWheel>", "<Button-4>", "<Button-5>")
+
+
+def snapshot(app):
+    """统计全局绑定、Tcl 命令、待执行回调和进度条上的绑定/图形数量"""
+    tcl = app.tk
+    counts = {
+        "bind_all 回调": sum(
+            len(tcl.call("bind", "all", seq).strip().splitlines()) for seq in GLOBAL_SEQUENCES),
+        # 布局图片（每张图片也是一个命令）随结果大小出现或消失，不计入
+        "Tcl 命令": len(set(tcl.splitlist(tcl.call("info", "commands")))
+                        - set(tcl.splitlist(tcl.call("image", "names")))),
+        "after 回调": len(tcl.splitlist(tcl.call("after", "info"))),
+        "进度条 <Configure> 回调": 0,
+        "进度条图形": 0,
+    }
+    if app.result_pane is not None and app.result_pane.built:
+        for widgets in app.result_pane.meals.values():
+            canvas = widgets["progress"]
+            counts["进度条 <Configure> 回调"] += len(
+                tcl.call("bind", str(canvas), "<Configure>").strip().splitlines())
+            counts["进度条图形"] += len(canvas.find_all())
+    return counts
+
+
+def calculate_once(app, rng):
+    """填入随机参数，点击计算并等待结果显示"""
+    app.population.set(str(rng.randint(1, 1000)))
+    app.growing_days.set("60")
+    crop = rng.choice(CROPS)
+    soils = [s for s in SOILS if crop.growth_days.get(s.name) is not None]
+    app.crop_var.set(crop.name)
+    app.soil_var.set(rng.choice(soils).display)
+
+    app.perform_calculation()
+    while app.pending_calculation is not None:
+        app.update()
+        time.sleep(0.001)
+    app.update()
+
+
+def soak(app, iterations, seed=0):
+    rng = random.Random(seed)
+    app.show_calculator()
+    calculate_once(app, rng)
+    baseline = snapshot(app)
+
+    for i in range(iterations):
+        calculate_once(app, rng)
+        # 模拟拖动窗口边缘：一连串尺寸变化
+        if i % 10 == 0:
+            for width in range(950, 1050, 10):
+                app.geometry(f"{width}x700")
+                app.update()
+        # 返回主菜单再进入计算界面，结果区域整体重建
+        if i % 50 == 49:
+            app.show_main_menu()
+            app.update()
+            app.show_calculator()
+            calculate_once(app, rng)
+
+    app.update()
+    return baseline, snapshot(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=300, help="计算次数")
+    args = parser.parse_args()
+
+    display = None
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        try:
+            from pyvirtualdisplay import Display
+        except ImportError:
+            print("没有 DISPLAY，且未安装 pyvirtualdisplay，无法运行", file=sys.stderr)
+            sys.exit(2)
+        display = Display(visible=False, size=(1280, 1024))
+        display.start()
+
+    try:
+        from gui import FarmCalculatorApp
+
+        app = FarmCalculatorApp()
+        try:
+            start = time.perf_counter()
+            baseline, final = soak(app, args.iterations)
+            elapsed = time.perf_counter() - start
+        finally:
+            app.destroy()
+    finally:
+        if display is not None:
+            display.stop()
+
+    grown = False
+    print(f"{args.iterations} 次计算，耗时 {elapsed:.1f} 秒")
+    for name, before in baseline.items():
+        after = final[name]
+        flag = ""
+        if after > before:
+            flag = "  <-- 增长"
+            grown = True
+        print(f"  {name:24s} {before:8d} -> {after:8d}{flag}")
+    sys.exit(1 if grown else 0)
+
+
+if __name__ == "__main__":
+    main()
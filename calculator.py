@@ -1,31 +1,57 @@
 """纯计算逻辑——无IO，可直接被CLI/GUI/API调用"""
 import math
-from models import Crop, Soil, FarmResult, MEALS, YEAR_DAYS
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+from models import Crop, Soil, FarmResult, FarmBatchResult, LayoutDimensions, RankedOption
+from models import PortfolioAllocation, PortfolioPlan, SOILS_BY_ID
+from models import CROPS, SOILS, MEALS, YEAR_DAYS
 
 
-def optimal_layout(tiles: int) -> str:
-    """计算最佳种植布局（最接近正方形）"""
+@lru_cache(maxsize=65536)
+def layout_dimensions(tiles: int) -> LayoutDimensions:
+    """计算最佳种植布局（最接近正方形）的宽、高和空格数"""
     if tiles <= 0:
-        return "无需种植"
+        return LayoutDimensions(0, 0, 0)
+
+    def score(w):
+        h = math.ceil(tiles / w)
+        return abs(w - h) + (w * h - tiles) * 0.1, h
+
+    # 以 isqrt 附近的布局得分作为上界。宽度 w 的得分下界为
+    # n/w - w（w ≤ √n）或 w - n/w - 1（w > √n），越远离 √n 越大，
+    # 下界超过上界的宽度不可能成为最优，解二次不等式得到搜索窗口。
+    # 上界额外加 1 以抵消浮点误差，窗口内的比较方式与全量扫描相同，结果一致。
+    limit = min(int(tiles**0.5 * 2), tiles)
+    root = math.isqrt(tiles)
+    bound = min(score(w)[0] for w in (root, root + 1) if w <= limit) + 1
+    lo = int((-bound + math.sqrt(bound * bound + 4 * tiles)) / 2) - 1
+    hi = int((bound + 1 + math.sqrt((bound + 1) ** 2 + 4 * tiles)) / 2) + 1
 
     best_w, best_h = 1, tiles
     best_diff = float('inf')
 
-    for w in range(1, min(int(tiles**0.5 * 2), tiles) + 1):
-        h = math.ceil(tiles / w)
-        diff = abs(w - h) + (w * h - tiles) * 0.1
+    for w in range(max(lo, 1), min(hi, limit) + 1):
+        diff, h = score(w)
 
         if diff < best_diff and w * h >= tiles:
             best_diff, best_w, best_h = diff, w, h
 
-    if best_w == best_h:
-        return f"{best_w}×{best_h}"
-    return f"{best_w}×{best_h} (共{best_w * best_h}格)"
+    return LayoutDimensions(best_w, best_h, best_w * best_h - tiles)
 
 
-def calculate_farmland(crop: Crop, soil: Soil, population: int, growing_days: int) -> FarmResult:
-    """计算农场需求和产出"""
-    # 验证生长期
+def optimal_layout(tiles: int) -> str:
+    """计算最佳种植布局（最接近正方形）"""
+    if tiles <= 0:
+        return "无需种植"
+
+    dims = layout_dimensions(tiles)
+    if dims.width == dims.height:
+        return f"{dims.width}×{dims.height}"
+    return f"{dims.width}×{dims.height} (共{dims.width * dims.height}格)"
+
+
+def validate_planting(crop: Crop, soil: Soil, growing_days: int) -> float:
+    """验证作物能否在该土地和生长期内种植，返回作物生长天数"""
     crop_growth_days = crop.growth_days.get(soil.name)
     if crop_growth_days is None:
         raise ValueError(f"{crop.name}不能种植在{soil.display}")
@@ -33,18 +59,20 @@ def calculate_farmland(crop: Crop, soil: Soil, population: int, growing_days: in
         raise ValueError(
             f"{crop.name}需要{crop_growth_days}天生长期，但当前只有{growing_days}天"
         )
+    return crop_growth_days
+
+
+def crop_yield(crop: Crop, soil: Soil, growing_days: int) -> Tuple[float, float]:
+    """验证可种植后返回 (年收获次数, 每格年产量)"""
+    crop_growth_days = validate_planting(crop, soil, growing_days)
 
-    # 计算产量
     effective_fertility = 1 + (soil.fertility - 1) * crop.fertility_sensitivity
     harvests = growing_days // crop_growth_days
-    annual_yield = crop.base_yield * harvests * effective_fertility
+    return harvests, crop.base_yield * harvests * effective_fertility
 
-    # 计算格数需求
-    nutrition_needed = population * 1.6 * YEAR_DAYS
-    tiles_needed = math.ceil(nutrition_needed / (annual_yield * 0.05) * 1.05)
 
-    # 计算餐饮产出
-    total_nutrition = annual_yield * tiles_needed * 0.05
+def meal_production(total_nutrition: float) -> Dict[str, Dict[str, Union[int, float]]]:
+    """按总营养计算每种餐饮的产量和供养人数"""
     meal_data = {}
 
     for name, meal in MEALS.items():
@@ -58,12 +86,325 @@ def calculate_farmland(crop: Crop, soil: Soil, population: int, growing_days: in
             "supported_people": round(supported, 1),
         }
 
+    return meal_data
+
+
+def tiles_needed(population: int, annual_yield: float) -> int:
+    """按每格年产量计算养活 population 人所需的格数（含5%冗余）"""
+    nutrition_needed = population * 1.6 * YEAR_DAYS
+    return math.ceil(nutrition_needed / (annual_yield * 0.05) * 1.05)
+
+
+def max_population(crop: Crop, soil: Soil, tiles: int, growing_days: int) -> int:
+    """
+    给定格数最多能养活多少殖民者（calculate_farmland 的反函数）。
+
+    所需格数随人数单调不减：先用闭式解估计人数，再按 calculate_farmland
+    的同一公式上下修正浮点误差。返回的人数所需格数不超过 tiles，多一人即超出。
+    """
+    _, annual_yield = crop_yield(crop, soil, growing_days)
+    if tiles < 0:
+        raise ValueError("格数不能为负数")
+
+    population = int(tiles * annual_yield * 0.05 / 1.05 / (1.6 * YEAR_DAYS))
+    while tiles_needed(population + 1, annual_yield) <= tiles:
+        population += 1
+    while population > 0 and tiles_needed(population, annual_yield) > tiles:
+        population -= 1
+    return population
+
+
+def calculate_farmland(crop: Crop, soil: Soil, population: int, growing_days: int) -> FarmResult:
+    """计算农场需求和产出"""
+    # 验证生长期并计算产量
+    harvests, annual_yield = crop_yield(crop, soil, growing_days)
+
+    # 计算格数需求
+    tiles = tiles_needed(population, annual_yield)
+
+    # 计算餐饮产出
+    total_nutrition = annual_yield * tiles * 0.05
+    meal_data = meal_production(total_nutrition)
+
+    dims = layout_dimensions(tiles)
     return FarmResult(
         crop_name=crop.name,
         soil_name=soil.display,
-        tiles=tiles_needed,
+        tiles=tiles,
         harvests=harvests,
-        layout=optimal_layout(tiles_needed),
-        annual_yield=annual_yield * tiles_needed,
+        layout=optimal_layout(tiles),
+        width=dims.width,
+        height=dims.height,
+        padding_tiles=dims.padding_tiles,
+        annual_yield=annual_yield * tiles,
         meal_data=meal_data,
     )
+
+
+RANK_KEYS = ("tiles", "surplus", "score")
+
+
+def viable_pairs(growing_days: int) -> List[Tuple[Crop, Soil]]:
+    """在给定生长期内可以种植的全部 (作物, 土地) 组合"""
+    pairs = []
+    for crop in CROPS:
+        for soil in SOILS:
+            days = crop.growth_days.get(soil.name)
+            if days is not None and days <= growing_days:
+                pairs.append((crop, soil))
+    return pairs
+
+
+@lru_cache(maxsize=4096)
+def rank_farmland(population: int, growing_days: int, by: str = "tiles",
+                  meal: Optional[str] = None, tiles_weight: float = 1.0,
+                  surplus_weight: float = 1.0) -> Tuple[RankedOption, ...]:
+    """
+    在整个作物/土地目录中计算所有可行方案并排序。
+
+    by="tiles" 按所需格数从少到多；by="surplus" 按餐饮盈余（所选餐饮可供养人数
+    减去殖民者数量）从多到少；by="score" 按加权得分从低到高，
+    得分 = tiles_weight × 格数/最少格数 − surplus_weight × 盈余/殖民者数量。
+    无法种植的组合事先剔除。结果被缓存并在调用间共享，请勿修改。
+    """
+    if by not in RANK_KEYS:
+        raise ValueError(f"未知排序方式: {by}（可选 {', '.join(RANK_KEYS)}）")
+    if population < 1:
+        raise ValueError("殖民者数量必须大于0")
+    meal = meal or next(iter(MEALS))
+    if meal not in MEALS:
+        raise ValueError(f"未知餐饮类型: {meal}")
+
+    results = [
+        (crop, soil, calculate_farmland(crop, soil, population, growing_days))
+        for crop, soil in viable_pairs(growing_days)
+    ]
+    if not results:
+        return ()
+
+    min_tiles = min(result.tiles for _, _, result in results)
+    options = []
+    for crop, soil, result in results:
+        surplus = round(result.meal_data[meal]["supported_people"] - population, 1)
+        score = tiles_weight * result.tiles / min_tiles - surplus_weight * surplus / population
+        options.append(RankedOption(crop.id, soil.id, result, surplus, score))
+
+    sort_keys = {
+        "tiles": lambda o: (o.result.tiles, -o.surplus),
+        "surplus": lambda o: (-o.surplus, o.result.tiles),
+        "score": lambda o: (o.score, o.result.tiles),
+    }
+    return tuple(sorted(options, key=sort_keys[by]))
+
+
+PORTFOLIO_OBJECTIVES = ("min_tiles", "max_yield")
+PORTFOLIO_TOLERANCE = 1e-9  # 剩余营养需求低于此值视为已满足（浮点减法的残差）
+
+
+def plan_portfolio(budgets: Dict[int, int], population: int, growing_days: int,
+                   objective: str = "min_tiles") -> PortfolioPlan:
+    """
+    在各土地的格数上限内规划混合种植方案（精确解）。
+
+    budgets 为 {土地ID: 可用格数}。objective="min_tiles" 求满足营养需求
+    （含5%冗余）的最少总格数；"max_yield" 把所有可用格数都种上，使总产量最大。
+
+    同一土地上每格互相独立，只种该土地上单格营养最高的作物不会更差；
+    不同土地之间，k 格能达到的最大营养就是单格营养最高的 k 格之和，
+    因此按单格营养从高到低依次填满各土地即为整数最优解。
+    复杂度 O(作物数 × 土地数)，无需外部求解器。
+    """
+    if objective not in PORTFOLIO_OBJECTIVES:
+        raise ValueError(f"未知优化目标: {objective}（可选 {', '.join(PORTFOLIO_OBJECTIVES)}）")
+
+    # 每种土地只保留单格产量最高的作物
+    best = {}
+    for soil_id, budget in budgets.items():
+        soil = SOILS_BY_ID.get(soil_id)
+        if soil is None:
+            raise ValueError(f"土地ID {soil_id} 不存在")
+        if budget < 0:
+            raise ValueError(f"{soil.display}的可用格数不能为负数")
+
+        for crop in CROPS:
+            days = crop.growth_days.get(soil.name)
+            if days is None or days > growing_days or budget == 0:
+                continue
+            _, annual_yield = crop_yield(crop, soil, growing_days)
+            if soil_id not in best or annual_yield > best[soil_id][1]:
+                best[soil_id] = (crop, annual_yield)
+
+    # 按单格产量从高到低分配格数。某块土地按需求取整后的格数放得下时，
+    # 需求已被满足（与 calculate_farmland 的取整相同），不再依赖浮点残差判断
+    remaining = population * 1.6 * YEAR_DAYS
+    covered = False
+    allocations = []
+    for soil_id, (crop, annual_yield) in sorted(
+            best.items(), key=lambda item: item[1][1], reverse=True):
+        budget = budgets[soil_id]
+        if objective == "min_tiles":
+            if covered or remaining <= PORTFOLIO_TOLERANCE:
+                break
+            tiles = math.ceil(remaining / (annual_yield * 0.05) * 1.05)
+            if tiles <= budget:
+                covered = True
+            else:
+                tiles = budget
+        else:
+            tiles = budget
+        remaining -= annual_yield * tiles * 0.05 / 1.05
+
+        soil = SOILS_BY_ID[soil_id]
+        allocations.append(PortfolioAllocation(
+            crop_id=crop.id,
+            soil_id=soil_id,
+            crop_name=crop.name,
+            soil_name=soil.display,
+            tiles=tiles,
+            annual_yield=annual_yield * tiles,
+        ))
+
+    total_yield = sum(a.annual_yield for a in allocations)
+    return PortfolioPlan(
+        objective=objective,
+        feasible=covered or remaining <= PORTFOLIO_TOLERANCE,
+        total_tiles=sum(a.tiles for a in allocations),
+        annual_yield=total_yield,
+        allocations=allocations,
+        meal_data=meal_production(total_yield * 0.05),
+    )
+
+
+def _id_index(np, ids, table_ids):
+    """把ID数组映射为目录中的下标，不存在的ID映射为 -1"""
+    lookup = np.full(max(table_ids) + 1, -1, dtype=np.int64)
+    lookup[list(table_ids)] = np.arange(len(table_ids))
+    in_range = (ids >= 0) & (ids < len(lookup))
+    return np.where(in_range, lookup[np.where(in_range, ids, 0)], -1)
+
+
+def calculate_farmland_batch(crop_ids, soil_ids, populations, growing_days) -> FarmBatchResult:
+    """
+    向量化批量计算农场需求。
+
+    参数可以是数组或标量，按 NumPy 规则广播。无法种植的组合（ID不存在、
+    作物不能种在该土地、生长期不足）不抛出 ValueError，而是在 valid 中
+    标记为 False，对应行的数值为 0。有效行与 calculate_farmland 结果逐位一致。
+    多维参数的结果按广播后的形状展平（C 顺序）。
+    """
+    import numpy as np
+
+    crop_ids, soil_ids, populations, growing_days = np.broadcast_arrays(
+        np.asarray(crop_ids, dtype=np.int64),
+        np.asarray(soil_ids, dtype=np.int64),
+        np.asarray(populations, dtype=np.int64),
+        np.asarray(growing_days, dtype=np.int64),
+    )
+    valid, harvests, annual_yield = _batch_yield(np, crop_ids, soil_ids, growing_days)
+    people = np.where(valid, populations, 0).astype(np.float64)
+
+    # 计算格数需求
+    nutrition_needed = people * 1.6 * YEAR_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tiles = np.ceil(nutrition_needed / (annual_yield * 0.05) * 1.05)
+    tiles = np.where(valid, tiles, 0).astype(np.int64)
+
+    # 计算餐饮产出
+    total_nutrition = annual_yield * tiles * 0.05
+    meal_names = tuple(MEALS)
+    total_meals = np.empty(tiles.shape + (len(meal_names),), dtype=np.int64)
+    daily_meals = np.empty(total_meals.shape, dtype=np.float64)
+    supported_people = np.empty(total_meals.shape, dtype=np.float64)
+
+    for j, meal in enumerate(MEALS.values()):
+        meals_count = (total_nutrition // meal.input).astype(np.int64)
+        nutrition_output = meals_count * meal.output
+        total_meals[..., j] = meals_count
+        daily_meals[..., j] = _round1(np, meals_count / YEAR_DAYS)
+        supported_people[..., j] = _round1(np, nutrition_output / (1.6 * YEAR_DAYS))
+
+    return FarmBatchResult(
+        crop_ids=crop_ids,
+        soil_ids=soil_ids,
+        valid=valid,
+        tiles=tiles,
+        harvests=harvests,
+        annual_yield=annual_yield * tiles,
+        meal_names=meal_names,
+        total_meals=total_meals,
+        daily_meals=daily_meals,
+        supported_people=supported_people,
+    )
+
+
+def _batch_yield(np, crop_ids, soil_ids, growing_days):
+    """向量化验证可种植并计算 (valid, 年收获次数, 每格年产量)"""
+    sensitivity = np.array([c.fertility_sensitivity for c in CROPS], dtype=np.float64)
+    base_yield = np.array([c.base_yield for c in CROPS], dtype=np.float64)
+    fertility = np.array([s.fertility for s in SOILS], dtype=np.float64)
+    growth = np.array(
+        [[c.growth_days.get(s.name) for s in SOILS] for c in CROPS], dtype=np.float64
+    )  # None -> nan
+
+    ci = _id_index(np, crop_ids, [c.id for c in CROPS])
+    si = _id_index(np, soil_ids, [s.id for s in SOILS])
+    known = (ci >= 0) & (si >= 0)
+    ci, si = np.where(known, ci, 0), np.where(known, si, 0)
+
+    # 验证生长期
+    crop_growth_days = growth[ci, si]
+    with np.errstate(invalid="ignore"):
+        valid = known & ~np.isnan(crop_growth_days) & (crop_growth_days <= growing_days)
+    crop_growth_days = np.where(valid, crop_growth_days, 1.0)
+    days = np.where(valid, growing_days, 0).astype(np.float64)
+
+    # 计算产量（运算顺序与 calculate_farmland 保持一致，保证浮点结果相同）
+    effective_fertility = 1 + (fertility[si] - 1) * sensitivity[ci]
+    harvests = days // crop_growth_days
+    annual_yield = base_yield[ci] * harvests * effective_fertility
+    return valid, harvests, annual_yield
+
+
+def max_population_batch(crop_ids, soil_ids, tiles, growing_days):
+    """
+    max_population 的向量化版本。
+
+    参数按 NumPy 规则广播，返回 (最大人数数组, valid 掩码)；
+    无法种植或格数为负的组合 valid 为 False，人数为 0。
+    """
+    import numpy as np
+
+    crop_ids, soil_ids, tiles, growing_days = np.broadcast_arrays(
+        np.asarray(crop_ids, dtype=np.int64),
+        np.asarray(soil_ids, dtype=np.int64),
+        np.asarray(tiles, dtype=np.int64),
+        np.asarray(growing_days, dtype=np.int64),
+    )
+    valid, _, annual_yield = _batch_yield(np, crop_ids, soil_ids, growing_days)
+    valid &= tiles >= 0
+    annual_yield = np.where(valid, annual_yield, 1.0)
+    tiles = np.where(valid, tiles, 0)
+
+    def needed(population):
+        return np.ceil(population * 1.6 * YEAR_DAYS / (annual_yield * 0.05) * 1.05)
+
+    population = (tiles * annual_yield * 0.05 / 1.05 / (1.6 * YEAR_DAYS)).astype(np.int64)
+    while True:
+        grow = needed(population + 1) <= tiles
+        if not grow.any():
+            break
+        population += grow
+    while True:
+        shrink = (population > 0) & (needed(population) > tiles)
+        if not shrink.any():
+            break
+        population -= shrink
+
+    return np.where(valid, population, 0), valid
+
+
+def _round1(np, values):
+    """与内置 round(x, 1) 完全一致的舍入（np.round 先乘10再取整，个别值会差一位）"""
+    unique, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(v, 1) for v in unique.tolist()], dtype=np.float64)
+    return rounded[inverse].reshape(values.shape)
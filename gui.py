@@ -1,39 +1,120 @@
+import time
+
+_IMPORT_START = time.perf_counter()  # 启动计时起点
+
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, Canvas
-from tkinter.font import Font
-import math
+from tkinter import ttk, messagebox, Canvas
 import sys
 import os
-from PIL import Image, ImageTk, ImageDraw
-
-# 从main.py导入所有数据模型、配置和计算函数
-from importlib import import_module
-import importlib.util
-
-# 动态导入main.py模块
-spec = importlib.util.spec_from_file_location(
-    "farm_calc", os.path.join(os.path.dirname(__file__), "main.py"))
-farm_calc = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(farm_calc)
-
-# 从main.py中导入所有数据模型和计算函数
-Crop = farm_calc.Crop
-Soil = farm_calc.Soil
-MealType = farm_calc.MealType
-FarmResult = farm_calc.FarmResult
-YEAR_DAYS = farm_calc.YEAR_DAYS
-CROPS = farm_calc.CROPS
-SOILS = farm_calc.SOILS
-MEALS = farm_calc.MEALS
-calculate_farmland = farm_calc.calculate_farmland
-optimal_layout = farm_calc.optimal_layout
+from concurrent.futures import ThreadPoolExecutor
+
+from models import CROPS, SOILS, MEALS, CROPS_BY_NAME, SOILS_BY_DISPLAY, GAME_VERSION
+from models import MAX_POPULATION, YEAR_DAYS
+from calculator import calculate_farmland
+
+_IMPORT_END = time.perf_counter()
+
+# === 布局可视化设置 ===
+LAYOUT_FIELD_COLORS = ["#8BC34A", "#AED581", "#C5E1A5"]  # 不同深浅的绿色
+LAYOUT_PADDING_COLOR = "#f0f0f0"  # 额外格子的颜色
+# 布局总格数超过该值时改为栅格化成单张图片绘制
+RASTER_THRESHOLD = int(os.environ.get("FARM_GUI_RASTER_THRESHOLD", "400"))
+CALC_POLL_INTERVAL = 30  # 轮询后台计算结果的间隔（毫秒）
+LIVE_DEBOUNCE_MS = 60  # 实时计算：输入变化后延迟多久计算，期间的连续变化合并为一次（毫秒）
+LAYOUT_MAX_WIDTH = 500  # 布局可视化区域最大宽度
+LAYOUT_MAX_HEIGHT = 200  # 布局可视化区域最大高度
+
+# === 事件绑定管理 ===
+
+
+class BindingScope:
+    """
+    随某个组件一起释放的一组事件绑定。
+
+    bind_all 注册的全局绑定不会随组件销毁而移除，对应的 Tcl 回调命令也会一直
+    保留；这里记录经由本对象注册的每个绑定和空闲回调，owner 销毁时逐个移除
+    （只删除自己的那一条，不影响同一事件上的其他绑定）。
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.bindings = []  # (目标, 事件, 回调命令名)，目标为组件路径或 "all"
+        self.pending_idle = set()
+        self.owner.bind("<Destroy>", self.on_destroy, add="+")
+
+    def bind(self, widget, sequence, func):
+        funcid = widget.bind(sequence, func, add="+")
+        self.bindings.append((str(widget), sequence, funcid))
+        return funcid
+
+    def bind_all(self, sequence, func):
+        funcid = self.owner.bind_all(sequence, func, add="+")
+        self.bindings.append(("all", sequence, funcid))
+        return funcid
+
+    def coalesce(self, widget, redraw):
+        """
+        返回一个事件处理函数：一连串事件（如拖动窗口时的 <Configure>）
+        只在空闲时执行一次 redraw。
+        """
+        state = {"after_id": None}
+
+        def run():
+            self.pending_idle.discard(state["after_id"])
+            state["after_id"] = None
+            if widget.winfo_exists():
+                redraw()
+
+        def handler(event=None):
+            if state["after_id"] is None:
+                state["after_id"] = widget.after_idle(run)
+                self.pending_idle.add(state["after_id"])
+
+        return handler
+
+    def on_destroy(self, event):
+        if event.widget is self.owner:
+            self.release()
+
+    def release(self):
+        """移除所有绑定并删除回调命令"""
+        tk_app = self.owner.tk
+        for after_id in self.pending_idle:
+            try:
+                self.owner.after_cancel(after_id)
+            except tk.TclError:
+                pass
+        self.pending_idle.clear()
+
+        for target, sequence, funcid in reversed(self.bindings):
+            try:
+                script = tk_app.call("bind", target, sequence)
+                kept = [line for line in script.split("\n") if funcid not in line]
+                tk_app.call("bind", target, sequence, "\n".join(kept))
+            except tk.TclError:
+                pass  # 目标组件已经销毁，其绑定随之消失
+            try:
+                self.owner.deletecommand(funcid)
+            except tk.TclError:
+                pass
+        self.bindings.clear()
+
 
 # === GUI应用程序 ===
 
 
 class FarmCalculatorApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, raster_threshold=RASTER_THRESHOLD):
         super().__init__()
+        self.raster_threshold = raster_threshold
+
+        # 后台计算线程：计算在工作线程中进行，结果通过 after() 轮询交回主线程
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="farm-calc")
+        self.pending_calculation = None
+        self.calc_generation = 0
+        self.calc_progress = None
+        self.result_pane = None
+        self.live_after = None  # 实时计算的防抖定时器
         self.title("边缘世界农场工具")
         self.geometry("1000x700")
         self.minsize(900, 650)
@@ -126,7 +207,7 @@ class FarmCalculatorApp(tk.Tk):
 
         self.version_label = ttk.Label(
             title_frame,
-            text="作者：吾之野望 | 数据版本：1.5.4069",
+            text=f"作者：吾之野望 | 数据版本：{GAME_VERSION}",
             background="white",
             foreground=self.neutral_color
         )
@@ -138,6 +219,11 @@ class FarmCalculatorApp(tk.Tk):
 
     def clear_content(self):
         """清除内容框架中的所有组件"""
+        self.cancel_calculation()
+        if self.live_after is not None:
+            self.after_cancel(self.live_after)
+            self.live_after = None
+        self.result_pane = None
         for widget in self.content_frame.winfo_children():
             widget.destroy()
 
@@ -306,6 +392,17 @@ class FarmCalculatorApp(tk.Tk):
         )
         pop_entry.pack(side=tk.LEFT)
 
+        # 人口滑块，与输入框双向同步
+        self.population_scale = ttk.Scale(
+            form_frame,
+            from_=1,
+            to=MAX_POPULATION,
+            orient=tk.HORIZONTAL,
+            value=5,
+            command=self.on_population_scale
+        )
+        self.population_scale.pack(fill=tk.X, pady=(0, 10))
+
         # 生长期天数
         days_frame = ttk.Frame(form_frame, style="Card.TFrame")
         days_frame.pack(fill=tk.X, pady=10)
@@ -393,6 +490,48 @@ class FarmCalculatorApp(tk.Tk):
         )
         back_btn.pack(side=tk.LEFT)
 
+        # 实时计算：输入变化后自动重新计算
+        self.live_var = tk.BooleanVar(value=False)
+        live_check = ttk.Checkbutton(
+            form_content,
+            text="实时计算（修改参数或拖动滑块时自动更新结果）",
+            variable=self.live_var,
+            command=self.on_input_changed
+        )
+        live_check.pack(anchor="w", pady=(0, 10))
+
+        # 计算进度与取消
+        status_frame = ttk.Frame(form_content, style="Card.TFrame")
+        status_frame.pack(fill=tk.X)
+
+        self.calc_progress = ttk.Progressbar(
+            status_frame,
+            mode="indeterminate",
+            length=150
+        )
+        self.calc_progress.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.cancel_btn = ttk.Button(
+            status_frame,
+            text="取消计算",
+            command=self.cancel_calculation,
+            width=10
+        )
+        self.cancel_btn.state(["disabled"])
+        self.cancel_btn.pack(side=tk.LEFT)
+
+        # 实时计算时的输入错误显示在这里，不弹窗打断输入
+        self.input_error = ttk.Label(
+            form_content,
+            background="white",
+            foreground=self.warning_color,
+            wraplength=300
+        )
+        self.input_error.pack(anchor="w", pady=(10, 0))
+
+        for var in (self.population, self.growing_days, self.crop_var, self.soil_var):
+            var.trace_add("write", self.on_input_changed)
+
         # === 右侧: 结果显示区域 ===
         self.result_card = ttk.Frame(main_container, style="Card.TFrame")
         self.result_card.grid(row=0, column=1, padx=(
@@ -419,398 +558,575 @@ class FarmCalculatorApp(tk.Tk):
         )
         initial_msg.pack(pady=50)
 
-    def perform_calculation(self):
-        """执行农场计算并以图形方式显示结果"""
-        try:
-            # 获取输入值
-            population = int(self.population.get())
-            growing_days = int(self.growing_days.get())
-
-            # 验证输入范围
-            if not (1 <= population <= 1000):
-                raise ValueError("殖民者数量必须在1到1000之间")
-
-            if not (1 <= growing_days <= 60):
-                raise ValueError("生长期天数必须在1到60之间")
-
-            # 获取选择的作物和土地
-            crop_name = self.crop_var.get()
-            soil_display = self.soil_var.get()
-
-            crop = next((c for c in CROPS if c.name == crop_name), None)
-            soil = next((s for s in SOILS if s.display == soil_display), None)
-
-            if not crop or not soil:
-                raise ValueError("请选择有效的作物和土地")
-
-            # 执行计算 - 使用1.py中的计算函数
-            result = calculate_farmland(crop, soil, population, growing_days)
-
-            # 清除旧的结果内容
-            for widget in self.result_content.winfo_children():
-                widget.destroy()
+    def read_inputs(self):
+        """读取并验证输入参数，返回 (作物, 土地, 殖民者数量, 生长期)，无效时抛出 ValueError"""
+        # 获取输入值
+        population = int(self.population.get())
+        growing_days = int(self.growing_days.get())
 
-            # 创建滚动区域以容纳结果
-            result_canvas = Canvas(self.result_content,
-                                   background="white",
-                                   highlightthickness=0)
-            scrollbar = ttk.Scrollbar(self.result_content,
-                                      orient="vertical",
-                                      command=result_canvas.yview)
+        # 验证输入范围
+        if not (1 <= population <= MAX_POPULATION):
+            raise ValueError(f"殖民者数量必须在1到{MAX_POPULATION}之间")
 
-            result_canvas.configure(yscrollcommand=scrollbar.set)
+        if not (1 <= growing_days <= YEAR_DAYS):
+            raise ValueError(f"生长期天数必须在1到{YEAR_DAYS}之间")
 
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            result_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # 获取选择的作物和土地
+        crop = CROPS_BY_NAME.get(self.crop_var.get())
+        soil = SOILS_BY_DISPLAY.get(self.soil_var.get())
 
-            # 创建可滚动的内容框架
-            result_frame = ttk.Frame(result_canvas, style="Card.TFrame")
-            result_canvas.create_window(
-                (0, 0), window=result_frame, anchor="nw", tags="result_frame")
+        if not crop or not soil:
+            raise ValueError("请选择有效的作物和土地")
 
-            # ===== 结果标题 =====
-            result_title = ttk.Label(
-                result_frame,
-                text="计算结果",
-                font=("Arial", 18, "bold"),
-                background="white",
-                foreground=self.heading_color
-            )
-            result_title.pack(anchor="w", pady=(0, 20))
-
-            # ===== 基本信息卡片 =====
-            basic_card = ttk.Frame(result_frame, style="Card.TFrame")
-            basic_card.pack(fill=tk.X, pady=10)
-            basic_card.configure(relief="solid", borderwidth=1)
+        return crop, soil, population, growing_days
 
-            basic_title = ttk.Label(
-                basic_card,
-                text="基本信息",
-                font=("Arial", 14, "bold"),
-                background="white",
-                foreground=self.heading_color
-            )
-            basic_title.pack(anchor="w", padx=15, pady=(10, 15))
-
-            # 创建信息网格
-            basic_grid = ttk.Frame(basic_card, style="Card.TFrame")
-            basic_grid.pack(fill=tk.X, padx=15, pady=(0, 15))
-
-            # 添加基本信息
-            info_items = [
-                ("作物：", result.crop_name, 0, 0),
-                ("土地：", result.soil_name, 0, 1),
-                ("年收获次数：", f"{result.harvests}次", 1, 0),
-                ("所需格数：", f"{result.tiles}格 (含5%冗余)", 1, 1),
-                ("推荐布局：", result.layout, 2, 0),
-                ("总产量：", f"{result.annual_yield:.0f}单位", 2, 1)
-            ]
-
-            for label_text, value_text, row, col in info_items:
-                label = ttk.Label(
-                    basic_grid,
-                    text=label_text,
-                    background="white",
-                    foreground=self.neutral_color
-                )
-                label.grid(row=row, column=col*2, sticky="w",
-                           padx=(0 if col == 0 else 20, 5), pady=5)
-
-                value = ttk.Label(
-                    basic_grid,
-                    text=value_text,
-                    background="white",
-                    foreground=self.heading_color,
-                    font=("Arial", 10, "bold")
-                )
-                value.grid(row=row, column=col*2+1, sticky="w", pady=5)
+    def perform_calculation(self):
+        """读取输入参数，在后台线程中执行农场计算"""
+        try:
+            inputs = self.read_inputs()
+        except ValueError as e:
+            messagebox.showerror("输入错误", str(e))
+            return
+        self.start_calculation(inputs)
+
+    def start_calculation(self, inputs, live=False):
+        """提交计算；新的计算会取代尚未完成的旧计算"""
+        self.cancel_calculation()
+        self.input_error.configure(text="")
+        crop, soil, population, growing_days = inputs
+        future = self.executor.submit(
+            calculate_farmland, crop, soil, population, growing_days)
+        self.pending_calculation = future
+        self.set_calculating(True)
+        self.after(CALC_POLL_INTERVAL, self.poll_calculation,
+                   future, self.calc_generation, population, live)
+
+    def poll_calculation(self, future, generation, population, live=False):
+        """在 Tk 主线程中轮询后台计算，完成后显示结果"""
+        if generation != self.calc_generation:
+            return  # 计算已被取消或被新的计算取代
+
+        if not future.done():
+            self.after(CALC_POLL_INTERVAL, self.poll_calculation,
+                       future, generation, population, live)
+            return
+
+        self.pending_calculation = None
+        self.set_calculating(False)
 
-            # 创建可视化的地块布局图
-            self.create_layout_visualization(
-                result_frame, result.tiles, result.layout)
+        try:
+            self.show_result(future.result(), population)
+        except ValueError as e:
+            if live:
+                self.input_error.configure(text=str(e))
+            else:
+                messagebox.showerror("输入错误", str(e))
+        except Exception as e:
+            messagebox.showerror("计算错误", f"发生错误：{str(e)}")
 
-            # ===== 餐饮生产卡片 =====
-            meals_card = ttk.Frame(result_frame, style="Card.TFrame")
-            meals_card.pack(fill=tk.X, pady=(20, 10))
-            meals_card.configure(relief="solid", borderwidth=1)
+    def on_population_scale(self, value):
+        """拖动滑块时同步到输入框（输入框的变化再触发实时计算）"""
+        population = str(round(float(value)))
+        if population != self.population.get():
+            self.population.set(population)
 
-            meals_title = ttk.Label(
-                meals_card,
-                text="餐饮生产能力",
-                font=("Arial", 14, "bold"),
-                background="white",
-                foreground=self.heading_color
-            )
-            meals_title.pack(anchor="w", padx=15, pady=(10, 15))
-
-            # 为每种餐饮类型创建一个卡片
-            for meal_type, data in result.meal_data.items():
-                meal_frame = ttk.Frame(meals_card, style="Card.TFrame")
-                meal_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
-
-                # 判断是否满足人口需求
-                is_sufficient = data['supported_people'] >= population
-                status_color = self.success_color if is_sufficient else self.warning_color
-                status_text = "充足" if is_sufficient else "不足"
-
-                # 餐饮类型和状态
-                meal_header = ttk.Frame(meal_frame, style="Card.TFrame")
-                meal_header.pack(fill=tk.X, pady=(0, 10))
-
-                meal_type_label = ttk.Label(
-                    meal_header,
-                    text=meal_type,
-                    font=("Arial", 12, "bold"),
-                    background="white",
-                    foreground=self.heading_color
-                )
-                meal_type_label.pack(side=tk.LEFT)
+    def on_input_changed(self, *args):
+        """输入变化时同步滑块；实时计算模式下合并连续变化后重新计算"""
+        try:
+            population = int(self.population.get())
+            if 1 <= population <= MAX_POPULATION and \
+                    round(self.population_scale.get()) != population:
+                self.population_scale.set(population)
+        except ValueError:
+            pass
+
+        # 已有待执行的计算时不再推迟，拖动滑块过程中结果也会持续刷新；
+        # 计算执行时读取的是最新输入，最后一次变化不会丢失
+        if self.live_var.get() and self.live_after is None:
+            self.live_after = self.after(LIVE_DEBOUNCE_MS, self.live_recalculate)
+
+    def live_recalculate(self):
+        """实时计算：输入无效时只提示，不弹窗"""
+        self.live_after = None
+        try:
+            inputs = self.read_inputs()
+        except ValueError as e:
+            self.input_error.configure(text=str(e))
+            return
+        self.start_calculation(inputs, live=True)
+
+    def cancel_calculation(self):
+        """取消正在进行的计算，其结果到达后会被丢弃"""
+        if self.pending_calculation is not None:
+            self.pending_calculation.cancel()  # 尚未开始的任务直接取消
+            self.pending_calculation = None
+        self.calc_generation += 1
+        self.set_calculating(False)
+
+    def set_calculating(self, busy):
+        """切换进度指示和取消按钮的状态"""
+        if self.calc_progress is None or not self.calc_progress.winfo_exists():
+            return
+
+        if busy:
+            self.calc_progress.start(15)
+            self.cancel_btn.state(["!disabled"])
+        else:
+            self.calc_progress.stop()
+            self.cancel_btn.state(["disabled"])
 
-                status_label = ttk.Label(
-                    meal_header,
-                    text=status_text,
-                    font=("Arial", 12, "bold"),
-                    background="white",
-                    foreground=status_color
-                )
-                status_label.pack(side=tk.RIGHT)
+    def show_result(self, result, population):
+        """以图形方式显示计算结果（结果区域组件常驻，只更新变化的部分）"""
+        if self.result_pane is None:
+            self.result_pane = ResultPane(self, self.result_content)
+        self.result_pane.update(result, population)
 
-                # 创建进度条来显示支持人口百分比
-                percent = min(100, data['supported_people'] / population * 100)
+    def draw_layout_cells(self, canvas, tiles, w, h, cell_size):
+        """逐格绘制布局网格（每格一个 Canvas 矩形，适合小布局）"""
+        field_colors = LAYOUT_FIELD_COLORS
 
-                progress_frame = ttk.Frame(meal_frame, style="Card.TFrame")
-                progress_frame.pack(fill=tk.X, pady=(0, 10))
+        for row in range(h):
+            for col in range(w):
+                idx = row * w + col
 
-                progress_canvas = Canvas(
-                    progress_frame,
-                    height=24,
-                    background="#f0f0f0",
-                    highlightthickness=0
-                )
-                progress_canvas.pack(fill=tk.X)
-
-                # 绘制进度条
-                bar_color = self.success_color if is_sufficient else self.warning_color
-                progress_canvas.create_rectangle(
-                    0, 0,
-                    progress_canvas.winfo_width() * percent / 100, 24,
-                    fill=bar_color, width=0, tags="progress"
-                )
+                # 如果超出实际所需格数，使用不同颜色
+                is_active = idx < tiles
+                color = field_colors[idx % len(
+                    field_colors)] if is_active else LAYOUT_PADDING_COLOR
 
-                # 进度条文本
-                text_x = progress_canvas.winfo_width() // 2
-                progress_canvas.create_text(
-                    text_x, 12,
-                    text=f"{data['supported_people']}/{population} 人 ({percent:.1f}%)",
-                    fill="white",
-                    font=("Arial", 10, "bold"),
-                    tags="progress_text"
+                # 绘制方格
+                canvas.create_rectangle(
+                    col * cell_size, row * cell_size,
+                    (col + 1) * cell_size, (row + 1) * cell_size,
+                    fill=color,
+                    outline="#dddddd" if is_active else "#e0e0e0"
                 )
 
-                # 更新进度条尺寸的事件
-                def update_progress(event, canvas=progress_canvas, percent=percent):
-                    canvas.delete("progress")
-                    canvas.delete("progress_text")
-
-                    width = event.width
-                    # 绘制新的进度条
-                    canvas.create_rectangle(
-                        0, 0, width * percent / 100, 24,
-                        fill=bar_color, width=0, tags="progress"
-                    )
-
-                    # 添加文本
+                # 如果格子足够大，添加坐标文本
+                if cell_size >= 20 and is_active:
                     canvas.create_text(
-                        width // 2, 12,
-                        text=f"{data['supported_people']}/{population} 人 ({percent:.1f}%)",
-                        fill="white" if percent > 50 else self.heading_color,
-                        font=("Arial", 10, "bold"),
-                        tags="progress_text"
+                        col * cell_size + cell_size / 2,
+                        row * cell_size + cell_size / 2,
+                        text=f"{idx+1}",
+                        fill="#33691E" if is_active else "#9e9e9e",
+                        font=("Arial", int(cell_size / 3))
                     )
 
-                progress_canvas.bind("<Configure>", update_progress)
+    def draw_layout_image(self, canvas, tiles, w, h, cell_size):
+        """把整个布局网格栅格化为一张图片，作为单个 Canvas 对象显示"""
+        # Pillow 只在大布局时才需要，按需导入以加快启动
+        from PIL import Image, ImageDraw, ImageTk
+
+        # 先生成每格一个像素的小图，再按最近邻放大到显示尺寸
+        colors = [bytes.fromhex(c[1:]) for c in LAYOUT_FIELD_COLORS]
+        cycle = b"".join(colors)
+        active = cycle * (tiles // len(colors)) + cycle[:tiles % len(colors) * 3]
+        padding = bytes.fromhex(LAYOUT_PADDING_COLOR[1:]) * (w * h - tiles)
+        grid = Image.frombytes("RGB", (w, h), active + padding)
+
+        width = max(1, round(w * cell_size))
+        height = max(1, round(h * cell_size))
+        image = grid.resize((width, height), Image.NEAREST)
+
+        # 格子足够大时再画分隔线和编号，线条数量只与行列数相关
+        draw = ImageDraw.Draw(image)
+        if cell_size >= 4:
+            for col in range(w + 1):
+                x = min(round(col * cell_size), width - 1)
+                draw.line([(x, 0), (x, height - 1)], fill="#dddddd")
+            for row in range(h + 1):
+                y = min(round(row * cell_size), height - 1)
+                draw.line([(0, y), (width - 1, y)], fill="#dddddd")
+        if cell_size >= 20:
+            for idx in range(tiles):
+                row, col = divmod(idx, w)
+                draw.text(
+                    ((col + 0.5) * cell_size, (row + 0.5) * cell_size),
+                    f"{idx+1}", fill="#33691E", anchor="mm"
+                )
 
-                # 详细数据
-                details_frame = ttk.Frame(meal_frame, style="Card.TFrame")
-                details_frame.pack(fill=tk.X)
+        photo = ImageTk.PhotoImage(image)
+        canvas.create_image(0, 0, image=photo, anchor="nw")
+        canvas.image = photo  # 保留引用，防止图片被垃圾回收
+
+    def report_startup_time(self):
+        """输出启动耗时：模块导入时间和到首次绘制完成的时间"""
+        now = time.perf_counter()
+        self.startup_timing = {
+            "import_ms": (_IMPORT_END - _IMPORT_START) * 1000,
+            "first_paint_ms": (now - _IMPORT_START) * 1000,
+        }
+        print(
+            f"启动耗时：导入 {self.startup_timing['import_ms']:.1f} ms，"
+            f"首次绘制 {self.startup_timing['first_paint_ms']:.1f} ms",
+            file=sys.stderr,
+        )
 
-                details = [
-                    ("全年总产量：", f"{data['total_meals']}份"),
-                    ("日均生产：", f"{data['daily_meals']}份/天"),
-                    ("供养能力：", f"{data['supported_people']}人")
-                ]
+    def destroy(self):
+        """关闭窗口时停止后台计算线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        super().destroy()
+
+
+class ResultPane:
+    """
+    计算结果区域。
+
+    组件在第一次显示结果时创建一次，之后每次计算只与上一次显示的内容比较，
+    更新发生变化的文字、颜色和进度条；布局尺寸不变时布局图也不重绘。
+    """
+
+    # (键, 标签, 行, 列)
+    BASIC_FIELDS = [
+        ("crop", "作物：", 0, 0),
+        ("soil", "土地：", 0, 1),
+        ("harvests", "年收获次数：", 1, 0),
+        ("tiles", "所需格数：", 1, 1),
+        ("layout", "推荐布局：", 2, 0),
+        ("annual_yield", "总产量：", 2, 1),
+    ]
+    MEAL_FIELDS = [
+        ("total_meals", "全年总产量："),
+        ("daily_meals", "日均生产："),
+        ("supported_people", "供养能力："),
+    ]
+
+    def __init__(self, app, parent):
+        self.app = app
+        self.parent = parent
+        self.built = False
+        self.previous = None  # 上一次显示的 (result, population)
+        self.layout_key = None  # 上一次绘制的布局 (tiles, w, h)
+        self.shown = {}  # 组件 -> 上一次设置的属性，用于跳过没有变化的 configure
+        self.values = {}
+        self.meals = {}
+
+    def update(self, result, population):
+        """显示新的计算结果"""
+        if self.previous == (result, population):
+            return
+        if not self.built:
+            self.build()
+
+        self.set(self.values["crop"], text=result.crop_name)
+        self.set(self.values["soil"], text=result.soil_name)
+        self.set(self.values["harvests"], text=f"{result.harvests}次")
+        self.set(self.values["tiles"], text=f"{result.tiles}格 (含5%冗余)")
+        self.set(self.values["layout"], text=result.layout)
+        self.set(self.values["annual_yield"], text=f"{result.annual_yield:.0f}单位")
+
+        self.update_layout(result)
+        for meal_type, data in result.meal_data.items():
+            self.update_meal(meal_type, data, population)
+
+        self.previous = (result, population)
+
+    def set(self, widget, **options):
+        """只在属性与上次不同时才调用 configure"""
+        if self.shown.get(widget) != options:
+            widget.configure(**options)
+            self.shown[widget] = options
+
+    # === 创建组件（只执行一次） ===
+
+    def build(self):
+        app = self.app
+
+        # 移除初始提示
+        for widget in self.parent.winfo_children():
+            widget.destroy()
 
-                for i, (label_text, value_text) in enumerate(details):
-                    label = ttk.Label(
-                        details_frame,
-                        text=label_text,
-                        background="white",
-                        foreground=self.neutral_color
-                    )
-                    label.grid(row=i, column=0, sticky="w", pady=2)
-
-                    value = ttk.Label(
-                        details_frame,
-                        text=value_text,
-                        background="white",
-                        foreground=self.heading_color,
-                        font=("Arial", 10, "bold")
-                    )
-                    value.grid(row=i, column=1, sticky="w", padx=5, pady=2)
+        # 创建滚动区域以容纳结果
+        self.canvas = Canvas(self.parent, background="white", highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self.parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # 结果区域内的所有绑定在画布销毁时一并移除
+        self.bindings = BindingScope(self.canvas)
+
+        # 创建可滚动的内容框架，内容尺寸变化时（合并后）更新滚动区域
+        self.frame = ttk.Frame(self.canvas, style="Card.TFrame")
+        self.canvas.create_window((0, 0), window=self.frame, anchor="nw", tags="result_frame")
+        self.bindings.bind(self.frame, "<Configure>", self.bindings.coalesce(
+            self.canvas,
+            lambda: self.canvas.configure(scrollregion=self.canvas.bbox("all"))))
+
+        # ===== 结果标题 =====
+        ttk.Label(
+            self.frame,
+            text="计算结果",
+            font=("Arial", 18, "bold"),
+            background="white",
+            foreground=app.heading_color
+        ).pack(anchor="w", pady=(0, 20))
+
+        self.build_basic_card()
+        self.build_layout_card()
+        self.build_meals_card()
+        self.build_notes()
+
+        # 添加鼠标滚轮支持：全局绑定，但只在指针位于结果区域时滚动
+        self.bindings.bind_all("<MouseWheel>", self.on_mousewheel)
+        self.bindings.bind_all("<Button-4>", self.on_mousewheel)  # X11
+        self.bindings.bind_all("<Button-5>", self.on_mousewheel)
+        self.built = True
+
+    def on_mousewheel(self, event):
+        path, canvas_path = str(event.widget), str(self.canvas)
+        if path != canvas_path and not path.startswith(canvas_path + "."):
+            return
+        if event.num == 4:
+            step = -1
+        elif event.num == 5:
+            step = 1
+        else:
+            step = int(-1*(event.delta/120))
+        self.canvas.yview_scroll(step, "units")
+
+    def card(self, title, pady):
+        card = ttk.Frame(self.frame, style="Card.TFrame")
+        card.pack(fill=tk.X, pady=pady)
+        card.configure(relief="solid", borderwidth=1)
+        ttk.Label(
+            card,
+            text=title,
+            font=("Arial", 14, "bold"),
+            background="white",
+            foreground=self.app.heading_color
+        ).pack(anchor="w", padx=15, pady=(10, 15))
+        return card
 
-                    if i == 2:  # 供养能力行
-                        value.configure(foreground=status_color)
+    def build_basic_card(self):
+        basic_card = self.card("基本信息", 10)
 
-            # ===== 说明信息 =====
-            note_frame = ttk.Frame(result_frame, style="Card.TFrame")
-            note_frame.pack(fill=tk.X, pady=(10, 0))
+        basic_grid = ttk.Frame(basic_card, style="Card.TFrame")
+        basic_grid.pack(fill=tk.X, padx=15, pady=(0, 15))
 
-            note_title = ttk.Label(
-                note_frame,
-                text="说明",
-                font=("Arial", 12, "bold"),
+        for key, label_text, row, col in self.BASIC_FIELDS:
+            ttk.Label(
+                basic_grid,
+                text=label_text,
                 background="white",
-                foreground=self.heading_color
-            )
-            note_title.pack(anchor="w")
-
-            notes = [
-                "• 此程序布局优先近似正方形，允许10%以内长宽差异",
-                "• 已包含5%产量冗余，防止意外损失",
-                "• 餐饮产出基于理想情况，实际生产中可能存在浪费"
-            ]
-
-            for note_text in notes:
-                note = ttk.Label(
-                    note_frame,
-                    text=note_text,
-                    background="white",
-                    foreground=self.neutral_color,
-                    wraplength=500
-                )
-                note.pack(anchor="w", pady=(5, 0))
-
-            # 配置滚动区域
-            result_frame.update_idletasks()
-            result_canvas.config(scrollregion=result_canvas.bbox("all"))
+                foreground=self.app.neutral_color
+            ).grid(row=row, column=col*2, sticky="w", padx=(0 if col == 0 else 20, 5), pady=5)
 
-            # 添加鼠标滚轮支持
-            def _on_mousewheel(event):
-                result_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-
-            result_canvas.bind_all("<MouseWheel>", _on_mousewheel)
+            value = ttk.Label(
+                basic_grid,
+                background="white",
+                foreground=self.app.heading_color,
+                font=("Arial", 10, "bold")
+            )
+            value.grid(row=row, column=col*2+1, sticky="w", pady=5)
+            self.values[key] = value
 
-        except ValueError as e:
-            messagebox.showerror("输入错误", str(e))
-        except Exception as e:
-            messagebox.showerror("计算错误", f"发生错误：{str(e)}")
+    def build_layout_card(self):
+        layout_card = self.card("推荐种植布局", 10)
 
-    def create_layout_visualization(self, parent_frame, tiles, layout_text):
-        """创建农场布局的可视化展示"""
-        # 解析布局文本获取宽度和高度
-        w, h = None, None
+        layout_viz_frame = ttk.Frame(layout_card, style="Card.TFrame")
+        layout_viz_frame.pack(padx=15, pady=(0, 15))
 
-        if "×" in layout_text:
-            parts = layout_text.split("×")
-            try:
-                w = int(parts[0].strip())
-                h_text = parts[1].split("(")[0].strip(
-                ) if "(" in parts[1] else parts[1].strip()
-                h = int(h_text)
-            except:
-                w, h = 1, tiles  # 默认为1×n布局
-        else:
-            w, h = 1, tiles
+        self.layout_canvas = Canvas(
+            layout_viz_frame,
+            width=1,
+            height=1,
+            background="white",
+            highlightthickness=1,
+            highlightbackground="#e0e0e0"
+        )
+        self.layout_canvas.pack(padx=10, pady=10)
 
-        # 创建布局可视化卡片
-        layout_card = ttk.Frame(parent_frame, style="Card.TFrame")
-        layout_card.pack(fill=tk.X, pady=10)
-        layout_card.configure(relief="solid", borderwidth=1)
+        self.layout_info = ttk.Label(
+            layout_viz_frame,
+            background="white",
+            foreground=self.app.neutral_color
+        )
+        self.layout_info.pack(pady=(5, 0))
 
-        layout_title = ttk.Label(
-            layout_card,
-            text="推荐种植布局",
-            font=("Arial", 14, "bold"),
+        # 有额外格子时才显示
+        self.layout_extra = ttk.Label(
+            layout_viz_frame,
             background="white",
-            foreground=self.heading_color
+            foreground=self.app.neutral_color,
+            font=("Arial", 9, "italic")
         )
-        layout_title.pack(anchor="w", padx=15, pady=(10, 15))
 
-        # 创建布局可视化
-        layout_viz_frame = ttk.Frame(layout_card, style="Card.TFrame")
-        layout_viz_frame.pack(padx=15, pady=(0, 15))
+    def build_meals_card(self):
+        meals_card = self.card("餐饮生产能力", (20, 10))
 
-        # 计算合适的方格大小
-        max_width = 500  # 可视化区域最大宽度
-        max_height = 200  # 可视化区域最大高度
+        # 为每种餐饮类型创建一个卡片
+        for meal_type in MEALS:
+            meal_frame = ttk.Frame(meals_card, style="Card.TFrame")
+            meal_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
 
-        # 单元格尺寸 (取决于网格大小，保持适当的比例)
-        cell_size = min(max_width / w, max_height / h, 40)  # 最大单元格尺寸为40px
+            # 餐饮类型和状态
+            meal_header = ttk.Frame(meal_frame, style="Card.TFrame")
+            meal_header.pack(fill=tk.X, pady=(0, 10))
 
-        # 创建Canvas来绘制布局网格
-        layout_canvas = Canvas(
-            layout_viz_frame,
-            width=w * cell_size,
-            height=h * cell_size,
-            background="white",
-            highlightthickness=1,
-            highlightbackground="#e0e0e0"
-        )
-        layout_canvas.pack(padx=10, pady=10)
+            ttk.Label(
+                meal_header,
+                text=meal_type,
+                font=("Arial", 12, "bold"),
+                background="white",
+                foreground=self.app.heading_color
+            ).pack(side=tk.LEFT)
 
-        # 绘制网格
-        field_colors = ["#8BC34A", "#AED581", "#C5E1A5"]  # 不同深浅的绿色
+            status = ttk.Label(meal_header, font=("Arial", 12, "bold"), background="white")
+            status.pack(side=tk.RIGHT)
 
-        for row in range(h):
-            for col in range(w):
-                idx = row * w + col
+            # 进度条显示支持人口百分比，矩形和文字只创建一次，之后移动/改色
+            progress_frame = ttk.Frame(meal_frame, style="Card.TFrame")
+            progress_frame.pack(fill=tk.X, pady=(0, 10))
 
-                # 如果超出实际所需格数，使用不同颜色
-                is_active = idx < tiles
-                color = field_colors[idx % len(
-                    field_colors)] if is_active else "#f0f0f0"
+            progress = Canvas(
+                progress_frame,
+                height=24,
+                background="#f0f0f0",
+                highlightthickness=0
+            )
+            progress.pack(fill=tk.X)
+
+            widgets = {
+                "status": status,
+                "progress": progress,
+                "bar": progress.create_rectangle(0, 0, 0, 24, width=0),
+                "text": progress.create_text(0, 12, font=("Arial", 10, "bold")),
+                "state": None,  # (百分比, 颜色, 文字)
+            }
+            # 窗口缩放和结果更新都只登记重绘，空闲时按最终宽度和状态画一次
+            widgets["redraw"] = self.bindings.coalesce(
+                progress, lambda w=widgets: self.draw_progress(w))
+            self.bindings.bind(progress, "<Configure>", widgets["redraw"])
+
+            # 详细数据
+            details_frame = ttk.Frame(meal_frame, style="Card.TFrame")
+            details_frame.pack(fill=tk.X)
+
+            for i, (key, label_text) in enumerate(self.MEAL_FIELDS):
+                ttk.Label(
+                    details_frame,
+                    text=label_text,
+                    background="white",
+                    foreground=self.app.neutral_color
+                ).grid(row=i, column=0, sticky="w", pady=2)
 
-                # 绘制方格
-                layout_canvas.create_rectangle(
-                    col * cell_size, row * cell_size,
-                    (col + 1) * cell_size, (row + 1) * cell_size,
-                    fill=color,
-                    outline="#dddddd" if is_active else "#e0e0e0"
+                value = ttk.Label(
+                    details_frame,
+                    background="white",
+                    foreground=self.app.heading_color,
+                    font=("Arial", 10, "bold")
                 )
+                value.grid(row=i, column=1, sticky="w", padx=5, pady=2)
+                widgets[key] = value
 
-                # 如果格子足够大，添加坐标文本
-                if cell_size >= 20 and is_active:
-                    layout_canvas.create_text(
-                        col * cell_size + cell_size / 2,
-                        row * cell_size + cell_size / 2,
-                        text=f"{idx+1}",
-                        fill="#33691E" if is_active else "#9e9e9e",
-                        font=("Arial", int(cell_size / 3))
-                    )
+            self.meals[meal_type] = widgets
 
-        # 添加说明文字
-        layout_info = ttk.Label(
-            layout_viz_frame,
-            text=f"总格数: {tiles}，布局: {w}×{h}" +
-            (f" (需要{tiles}格，共{w*h}格)" if w*h > tiles else ""),
+    def build_notes(self):
+        note_frame = ttk.Frame(self.frame, style="Card.TFrame")
+        note_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ttk.Label(
+            note_frame,
+            text="说明",
+            font=("Arial", 12, "bold"),
             background="white",
-            foreground=self.neutral_color
-        )
-        layout_info.pack(pady=(5, 0))
+            foreground=self.app.heading_color
+        ).pack(anchor="w")
 
-        # 如果有额外格子，添加说明
-        if w * h > tiles:
-            extra_info = ttk.Label(
-                layout_viz_frame,
-                text=f"注: 浅色方格为额外格子，实际仅需{tiles}格。",
+        notes = [
+            "• 此程序布局优先近似正方形，允许10%以内长宽差异",
+            "• 已包含5%产量冗余，防止意外损失",
+            "• 餐饮产出基于理想情况，实际生产中可能存在浪费"
+        ]
+
+        for note_text in notes:
+            ttk.Label(
+                note_frame,
+                text=note_text,
                 background="white",
-                foreground=self.neutral_color,
-                font=("Arial", 9, "italic")
-            )
-            extra_info.pack(pady=(5, 0))
+                foreground=self.app.neutral_color,
+                wraplength=500
+            ).pack(anchor="w", pady=(5, 0))
+
+    # === 原地更新 ===
+
+    def update_layout(self, result):
+        """布局尺寸变化时重绘布局图"""
+        tiles, w, h = result.tiles, result.width, result.height
+        if self.layout_key == (tiles, w, h):
+            return
+        self.layout_key = (tiles, w, h)
+
+        # 单元格尺寸 (取决于网格大小，保持适当的比例，最大40px)
+        cell_size = min(LAYOUT_MAX_WIDTH / w, LAYOUT_MAX_HEIGHT / h, 40)
+
+        canvas = self.layout_canvas
+        canvas.delete("all")
+        canvas.image = None
+        canvas.configure(width=w * cell_size, height=h * cell_size)
+
+        # 格子较多时整体绘制成一张图片，避免创建成千上万个 Canvas 对象
+        if w * h > self.app.raster_threshold:
+            self.app.draw_layout_image(canvas, tiles, w, h, cell_size)
+        else:
+            self.app.draw_layout_cells(canvas, tiles, w, h, cell_size)
+
+        self.set(self.layout_info, text=f"总格数: {tiles}，布局: {w}×{h}" +
+                 (f" (需要{tiles}格，共{w*h}格)" if result.padding_tiles else ""))
+
+        # 如果有额外格子，添加说明
+        if result.padding_tiles:
+            self.set(self.layout_extra, text=f"注: 浅色方格为额外格子，实际仅需{tiles}格。")
+            if not self.layout_extra.winfo_ismapped():
+                self.layout_extra.pack(pady=(5, 0))
+        else:
+            self.layout_extra.pack_forget()
+
+    def update_meal(self, meal_type, data, population):
+        widgets = self.meals[meal_type]
+
+        # 判断是否满足人口需求
+        is_sufficient = data['supported_people'] >= population
+        status_color = self.app.success_color if is_sufficient else self.app.warning_color
+
+        self.set(widgets["status"], text="充足" if is_sufficient else "不足",
+                 foreground=status_color)
+        self.set(widgets["total_meals"], text=f"{data['total_meals']}份")
+        self.set(widgets["daily_meals"], text=f"{data['daily_meals']}份/天")
+        self.set(widgets["supported_people"], text=f"{data['supported_people']}人",
+                 foreground=status_color)
+
+        percent = min(100, data['supported_people'] / population * 100)
+        state = (percent, status_color,
+                 f"{data['supported_people']}/{population} 人 ({percent:.1f}%)")
+        if widgets["state"] != state:
+            widgets["state"] = state
+            widgets["redraw"]()
+
+    def draw_progress(self, widgets):
+        """按进度条当前宽度移动矩形和文字"""
+        if widgets["state"] is None:
+            return
+        percent, color, text = widgets["state"]
+        canvas = widgets["progress"]
+        width = canvas.winfo_width()
+
+        canvas.coords(widgets["bar"], 0, 0, width * percent / 100, 24)
+        canvas.itemconfigure(widgets["bar"], fill=color)
+        canvas.coords(widgets["text"], width // 2, 12)
+        canvas.itemconfigure(widgets["text"], text=text,
+                             fill="white" if percent > 50 else self.app.heading_color)
 
 
 # 启动应用程序
 if __name__ == "__main__":
+    if "--profile" in sys.argv[1:] or os.environ.get("FARM_PROFILE") == "1":
+        import profiling
+        profiling.install()
+
     app = FarmCalculatorApp()
+    if "--timing" in sys.argv[1:] or os.environ.get("FARM_GUI_TIMING") == "1":
+        # 空闲回调在窗口首次绘制完成后才会执行
+        app.after_idle(app.report_startup_time)
     app.mainloop()
@@ -0,0 +1,105 @@
+"""API 响应的 JSON 编码——绕过 FastAPI 的 jsonable_encoder，直接把响应模型编码为字节
+
+按可用性依次选用 msgspec、orjson、标准库 json（都不是必需依赖）；
+设置环境变量 FARM_JSON=msgspec/orjson/json 可强制指定，便于对比。
+三者输出相同的紧凑 UTF-8 JSON，与 FastAPI 默认的 JSONResponse 一致。
+
+响应模型是普通 dataclass：msgspec 和 orjson 原生支持，首次编码时按类型
+生成编码方案并缓存；标准库后备则在类定义时取一次字段列表。
+"""
+import json
+import os
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Callable, Dict, List, Union
+
+from models import FarmResult, RankedOption
+
+BACKENDS = ("msgspec", "orjson", "json")
+
+
+@dataclass
+class CalculateResponse:
+    """/api/calculate 的响应"""
+    crop_name: str
+    soil_name: str
+    tiles: int
+    harvests: int
+    layout: str
+    width: int
+    height: int
+    padding_tiles: int
+    annual_yield: float
+    meal_data: Dict[str, Dict[str, Union[int, float]]]
+
+    @classmethod
+    def from_result(cls, result: FarmResult) -> "CalculateResponse":
+        """与 FarmResult.to_dict() 相同的字段和取整"""
+        return cls(result.crop_name, result.soil_name, result.tiles, result.harvests,
+                   result.layout, result.width, result.height, result.padding_tiles,
+                   round(result.annual_yield, 1), result.meal_data)
+
+
+@dataclass
+class OptimizeOption:
+    """/api/optimize 中的一个方案"""
+    crop_id: int
+    soil_id: int
+    surplus: float
+    score: float
+    result: CalculateResponse
+
+    @classmethod
+    def from_option(cls, option: RankedOption) -> "OptimizeOption":
+        return cls(option.crop_id, option.soil_id, option.surplus, round(option.score, 4),
+                   CalculateResponse.from_result(option.result))
+
+
+@dataclass
+class OptimizeResponse:
+    """/api/optimize 的响应"""
+    rank_by: str
+    options: List[OptimizeOption]
+
+
+def _stdlib_encoder() -> Callable[[object], bytes]:
+    field_names = {}  # dataclass 类型 -> 字段名元组
+
+    def default(obj):
+        cls = type(obj)
+        names = field_names.get(cls)
+        if names is None:
+            if not is_dataclass(cls):
+                raise TypeError(f"无法编码为 JSON: {cls.__name__}")
+            names = field_names[cls] = tuple(f.name for f in fields(cls))
+        return {name: getattr(obj, name) for name in names}
+
+    encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False,
+                               separators=(",", ":"), default=default)
+    return lambda obj: encoder.encode(obj).encode("utf-8")
+
+
+def encoder(backend: str) -> Callable[[object], bytes]:
+    """返回指定后端的编码函数；后端未安装时抛出 ImportError"""
+    if backend == "msgspec":
+        import msgspec
+        return msgspec.json.Encoder().encode
+    if backend == "orjson":
+        import orjson
+        return orjson.dumps
+    if backend == "json":
+        return _stdlib_encoder()
+    raise ValueError(f"未知的 JSON 后端: {backend}（可用 {', '.join(BACKENDS)}）")
+
+
+def _select_backend():
+    requested = os.environ.get("FARM_JSON")
+    if requested:
+        return requested, encoder(requested)
+    for backend in BACKENDS:
+        try:
+            return backend, encoder(backend)
+        except ImportError:
+            continue
+
+
+BACKEND, dumps = _select_backend()
@@ -1,6 +1,10 @@
 """farmCalculator CLI 入口 —— 边缘世界农场计算器"""
-from models import CROPS, SOILS
-from calculator import calculate_farmland
+import argparse
+import os
+import sys
+
+from models import CROPS_BY_ID, SOILS_BY_ID, GAME_VERSION, MAX_POPULATION, YEAR_DAYS
+from calculator import calculate_farmland, rank_farmland
 
 # === 终端颜色定义 ===
 
@@ -29,16 +33,16 @@ class Color:
 
 
 def select_from_menu(items, title):
-    """显示选择菜单并返回选择"""
+    """显示选择菜单并返回选择（items 为 ID 到选项的索引）"""
     print(f"\n{Color.BOLD}{Color.CYAN}=== {title} ==={Color.RESET}")
-    for item in items:
+    for item in items.values():
         name = getattr(item, 'display', item.name)
         print(f"{Color.YELLOW}{item.id}.{Color.RESET} {name}")
 
     while True:
         try:
             choice = int(input(f"{Color.GREEN}请选择编号: {Color.RESET}"))
-            selected = next((x for x in items if x.id == choice), None)
+            selected = items.get(choice)
             if selected:
                 return selected
             print(f"{Color.RED}错误：无效编号，请重新输入{Color.RESET}")
@@ -93,8 +97,8 @@ def run_calculator():
         population = get_number_input("\n请输入殖民者数量: ", 1, 1000)
         growing_days = get_number_input("请输入生长期天数 (1-60): ", 1, 60)
 
-        crop = select_from_menu(CROPS, "选择作物")
-        soil = select_from_menu(SOILS, "选择土地类型")
+        crop = select_from_menu(CROPS_BY_ID, "选择作物")
+        soil = select_from_menu(SOILS_BY_ID, "选择土地类型")
 
         result = calculate_farmland(crop, soil, population, growing_days)
         display_results(result, population)
@@ -103,26 +107,136 @@ def run_calculator():
         print(f"\n{Color.RED}发生错误：{str(e)}{Color.RESET}")
 
 
+def run_optimizer():
+    """对所有作物/土地组合计算并按所选方式排序显示"""
+    try:
+        population = get_number_input("\n请输入殖民者数量: ", 1, 1000)
+        growing_days = get_number_input("请输入生长期天数 (1-60): ", 1, 60)
+
+        print(f"\n{Color.BOLD}{Color.CYAN}=== 选择排序方式 ==={Color.RESET}")
+        print(f"{Color.YELLOW}1.{Color.RESET} 所需格数最少")
+        print(f"{Color.YELLOW}2.{Color.RESET} 餐饮盈余最多")
+        print(f"{Color.YELLOW}3.{Color.RESET} 综合得分最优")
+        rank_by = ("tiles", "surplus", "score")[get_number_input("请选择编号: ", 1, 3) - 1]
+
+        options = rank_farmland(population, growing_days, rank_by)
+        if not options:
+            print(f"\n{Color.RED}当前生长期内没有可种植的作物{Color.RESET}")
+            return
+
+        print(f"\n{Color.BOLD}{Color.CYAN}=== 推荐方案 ==={Color.RESET}")
+        for rank, option in enumerate(options, 1):
+            result = option.result
+            print(f"{Color.YELLOW}{rank:>2}.{Color.RESET} "
+                  f"{Color.BRIGHT_YELLOW}{result.crop_name}{Color.RESET} + "
+                  f"{Color.BRIGHT_YELLOW}{result.soil_name}{Color.RESET}  "
+                  f"{Color.BRIGHT_WHITE}{result.tiles}格{Color.RESET}  "
+                  f"布局 {result.layout}  盈余 {option.surplus:+}人  得分 {option.score:.2f}")
+
+    except Exception as e:
+        print(f"\n{Color.RED}发生错误：{str(e)}{Color.RESET}")
+
+
 def show_main_menu():
     """显示主菜单"""
     print(f"\n{Color.BOLD}{Color.CYAN}=== 边缘世界农场工具主菜单 ==={Color.RESET}")
     print(f"{Color.YELLOW}1. {Color.BRIGHT_WHITE}进行农场计算{Color.RESET}")
-    print(f"{Color.YELLOW}2. {Color.BRIGHT_WHITE}退出程序{Color.RESET}")
+    print(f"{Color.YELLOW}2. {Color.BRIGHT_WHITE}推荐作物和土地{Color.RESET}")
+    print(f"{Color.YELLOW}3. {Color.BRIGHT_WHITE}退出程序{Color.RESET}")
 
     while True:
         try:
             choice = int(input(f"\n{Color.GREEN}请选择操作: {Color.RESET}"))
-            if choice in [1, 2]:
+            if choice in [1, 2, 3]:
                 return choice
-            print(f"{Color.RED}错误：无效选择，请输入1或2{Color.RESET}")
+            print(f"{Color.RED}错误：无效选择，请输入1-3{Color.RESET}")
         except ValueError:
             print(f"{Color.RED}错误：请输入数字{Color.RESET}")
 
 
+def run_batch_command(args):
+    """batch 子命令：非交互批量计算"""
+    from batch_io import run_batch
+
+    try:
+        count = run_batch(args.input, args.output, args.format, args.output_format,
+                          args.jobs, args.chunk_size)
+    except ValueError as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # 下游（如 head）提前关闭管道时安静退出
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+    if args.output != "-":
+        print(f"已写出{count}行结果到 {args.output}", file=sys.stderr)
+    return 0
+
+
+def run_sweep_command(args):
+    """sweep 子命令：导出全参数空间"""
+    from sweep import export_sweep
+
+    try:
+        manifest = export_sweep(args.output, args.format, args.max_population, args.max_days)
+    except (ImportError, ValueError) as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return 2
+
+    print(f"已导出{manifest['rows']}行（{manifest['format']}）到 {args.output}，"
+          f"耗时{manifest['elapsed_seconds']}秒", file=sys.stderr)
+    return 0
+
+
+def parse_args(argv=None):
+    from batch_io import DEFAULT_CHUNK_SIZE, FORMATS
+
+    profile_help = "剖析计算函数，退出时输出耗时汇总和火焰图数据（同 FARM_PROFILE=1）"
+    parser = argparse.ArgumentParser(description="边缘世界农场工具，不带子命令时进入交互菜单")
+    parser.add_argument("--profile", action="store_true", help=profile_help)
+    # 子命令后也可以写 --profile；SUPPRESS 避免子命令的默认值覆盖前面的设置
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--profile", action="store_true", default=argparse.SUPPRESS,
+                        help=profile_help)
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser(
+        "batch", parents=[common], help="批量计算 CSV/JSONL 场景",
+        description="读取 crop_id, soil_id, population, growing_days 场景，逐行输出计算结果")
+    batch.add_argument("input", nargs="?", default="-", help="输入文件，默认标准输入")
+    batch.add_argument("-o", "--output", default="-", help="输出文件，默认标准输出")
+    batch.add_argument("-f", "--format", choices=FORMATS,
+                       help="输入格式，默认按扩展名推断，推断不出时为 csv")
+    batch.add_argument("--output-format", choices=FORMATS, help="输出格式，默认与输入相同")
+    batch.add_argument("-j", "--jobs", type=int, default=1,
+                       help="并行进程数（0 表示 CPU 核数），输出顺序与输入一致")
+    batch.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                       help="每块的场景数")
+
+    sweep = subparsers.add_parser(
+        "sweep", parents=[common], help="导出全参数空间到列式文件",
+        description="计算所有作物 × 土地 × 人数 × 生长期，写出 Parquet 或 .npy 列文件")
+    sweep.add_argument("output", help="输出目录")
+    sweep.add_argument("--format", choices=("parquet", "npy"),
+                       help="输出格式，默认安装了 pyarrow 时为 parquet，否则为 npy")
+    sweep.add_argument("--max-population", type=int, default=MAX_POPULATION,
+                       help="殖民者数量上限")
+    sweep.add_argument("--max-days", type=int, default=YEAR_DAYS, help="生长期天数上限")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        if args.jobs <= 0:
+            args.jobs = os.cpu_count() or 1
+        if args.chunk_size <= 0:
+            parser.error("--chunk-size 必须为正整数")
+    return args
+
+
 def main():
     """主程序入口"""
     print(f"\n{Color.BOLD}{Color.BRIGHT_CYAN}=== 边缘世界农场工具 ==={Color.RESET}")
-    print(f"{Color.BRIGHT_MAGENTA}作者：吾之野望 | 数据版本：1.5.4069{Color.RESET}")
+    print(f"{Color.BRIGHT_MAGENTA}作者：吾之野望 | 数据版本：{GAME_VERSION}{Color.RESET}")
 
     while True:
         choice = show_main_menu()
@@ -131,9 +245,21 @@ def main():
             print(f"\n{Color.GREEN}计算完成，按回车键返回主菜单...{Color.RESET}")
             input()
         elif choice == 2:
+            run_optimizer()
+            print(f"\n{Color.GREEN}计算完成，按回车键返回主菜单...{Color.RESET}")
+            input()
+        elif choice == 3:
             print(f"\n{Color.BRIGHT_YELLOW}感谢使用边缘世界农场工具，再见！{Color.RESET}")
             break
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.profile or os.environ.get("FARM_PROFILE") == "1":
+        import profiling
+        profiling.install()
+    if args.command == "batch":
+        sys.exit(run_batch_command(args))
+    if args.command == "sweep":
+        sys.exit(run_sweep_command(args))
     main()
@@ -0,0 +1,146 @@
+"""API 运行指标——端点延迟直方图、计算次数、缓存命中率、校验错误率，输出为 Prometheus 文本格式
+
+默认关闭；设置 FARM_METRICS=1 后 api.py 才会安装计时中间件和 /metrics 端点。
+关闭时各 record_* 函数只做一次布尔判断，不影响热路径。
+指标保存在进程内，多 worker 部署时每个进程各自计数。
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+ENABLED = os.environ.get("FARM_METRICS") == "1"
+
+# 延迟直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """按标签分组的计数器"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """按标签分组的累积直方图"""
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # 标签 -> [各桶计数..., +Inf 计数, 总和]
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        counts = self.values.get(key)
+        if counts is None:
+            counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, counts in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REQUEST_LATENCY = Histogram(
+    "farm_http_request_duration_seconds", "各端点的请求处理耗时")
+REQUESTS = Counter(
+    "farm_http_requests_total", "各端点按状态码统计的请求数")
+VALIDATION_ERRORS = Counter(
+    "farm_validation_errors_total", "参数校验失败（422）和不可种植（400）的请求数")
+CALCULATIONS = Counter(
+    "farm_calculations_total", "按作物和土地统计的单次计算次数（source=table 为查表命中）")
+CACHE_LOOKUPS = Counter(
+    "farm_cache_lookups_total", "请求级缓存的命中/未命中次数")
+
+# 抓取时才读取的 lru_cache 统计：名称 -> 返回 cache_info() 的函数
+_lru_caches: Dict[str, Callable] = {}
+
+
+def register_lru_cache(name: str, cached_fn):
+    """登记一个 functools.lru_cache 函数（或提供同样 cache_info() 的对象），抓取时输出其命中/未命中次数"""
+    _lru_caches[name] = cached_fn.cache_info
+
+
+def record_request(method: str, path: str, status: int, seconds: float):
+    if not ENABLED:
+        return
+    REQUEST_LATENCY.observe(seconds, method=method, path=path)
+    REQUESTS.inc(method=method, path=path, status=str(status))
+    if status in (400, 422):
+        VALIDATION_ERRORS.inc(path=path, status=str(status))
+
+
+def record_calculation(crop_name: str, soil_name: str, source: str = "compute"):
+    if ENABLED:
+        CALCULATIONS.inc(crop=crop_name, soil=soil_name, source=source)
+
+
+def record_cache(cache: str, hit: bool):
+    if ENABLED:
+        CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+async def timing_middleware(request, call_next):
+    """记录每个请求的耗时；路径使用路由模板，避免按原始 URL 产生无限多的标签"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    record_request(request.method, path, response.status_code, time.perf_counter() - start)
+    return response
+
+
+def render() -> str:
+    """生成 Prometheus 文本格式的全部指标"""
+    lines = []
+    for metric in (REQUEST_LATENCY, REQUESTS, VALIDATION_ERRORS, CALCULATIONS, CACHE_LOOKUPS):
+        lines += metric.render()
+
+    lru = Counter("farm_lru_cache_lookups_total", "进程内 lru_cache 的命中/未命中次数")
+    for name, cache_info in _lru_caches.items():
+        info = cache_info()
+        lru.inc(info.hits, cache=name, result="hit")
+        lru.inc(info.misses, cache=name, result="miss")
+    lines += lru.render()
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,15 @@
 """farmCalculator 数据模型和游戏配置数据"""
-from dataclasses import dataclass
-from typing import Dict, Optional, Union
+import hashlib
+import json
+import math
+import os
+import pickle
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 @dataclass
@@ -26,6 +35,13 @@ class MealType:
     output: float
 
 
+@dataclass(frozen=True)
+class LayoutDimensions:
+    width: int
+    height: int
+    padding_tiles: int  # 布局中超出所需格数的空格数量
+
+
 @dataclass
 class FarmResult:
     crop_name: str
@@ -33,30 +49,367 @@ class FarmResult:
     tiles: int
     harvests: int
     layout: str
+    width: int
+    height: int
+    padding_tiles: int  # 布局中超出所需格数的空格数量
     annual_yield: float
     meal_data: Dict[str, Dict[str, Union[int, float]]]
 
+    def to_dict(self) -> dict:
+        """转换为 API 返回的 JSON 结构"""
+        return {
+            "crop_name": self.crop_name,
+            "soil_name": self.soil_name,
+            "tiles": self.tiles,
+            "harvests": self.harvests,
+            "layout": self.layout,
+            "width": self.width,
+            "height": self.height,
+            "padding_tiles": self.padding_tiles,
+            "annual_yield": round(self.annual_yield, 1),
+            "meal_data": self.meal_data,
+        }
+
+
+@dataclass(frozen=True)
+class RankedOption:
+    """优化器给出的一个作物/土地方案"""
+    crop_id: int
+    soil_id: int
+    result: FarmResult
+    surplus: float  # 所选餐饮可供养人数减去殖民者数量
+    score: float  # 加权得分，越低越好
+
+
+@dataclass
+class PortfolioAllocation:
+    crop_id: int
+    soil_id: int
+    crop_name: str
+    soil_name: str
+    tiles: int
+    annual_yield: float
+
+
+@dataclass
+class PortfolioPlan:
+    """混合种植方案：每种土地上种什么、种多少格"""
+    objective: str
+    feasible: bool  # 是否满足殖民者的营养需求（含5%冗余）
+    total_tiles: int
+    annual_yield: float
+    allocations: List[PortfolioAllocation]
+    meal_data: Dict[str, Dict[str, Union[int, float]]]
+
+    def to_dict(self) -> dict:
+        """转换为 API 返回的 JSON 结构"""
+        return {
+            "objective": self.objective,
+            "feasible": self.feasible,
+            "total_tiles": self.total_tiles,
+            "annual_yield": round(self.annual_yield, 1),
+            "allocations": [
+                {**asdict(a), "annual_yield": round(a.annual_yield, 1)} for a in self.allocations
+            ],
+            "meal_data": self.meal_data,
+        }
+
+
+@dataclass
+class FarmBatchResult:
+    """
+    批量计算结果（列式）——每列长度相同，meal 列的形状为 (n, len(meal_names))。
+
+    餐饮数据按 meal_names 的顺序存成数值列，不为每个结果建字典；
+    需要时可按行转换为 FarmResult 或 JSON 结构。多维（广播得到的）
+    列在构造时按 C 顺序展平为一维，行号与 len() 一致。
+    """
+    crop_ids: "np.ndarray"
+    soil_ids: "np.ndarray"
+    valid: "np.ndarray"  # False 表示该组合无法种植（对应标量版本的 ValueError）
+    tiles: "np.ndarray"
+    harvests: "np.ndarray"
+    annual_yield: "np.ndarray"
+    meal_names: Tuple[str, ...]
+    total_meals: "np.ndarray"
+    daily_meals: "np.ndarray"
+    supported_people: "np.ndarray"
+
+    def __post_init__(self):
+        meal_count = len(self.meal_names)
+        for name in ("crop_ids", "soil_ids", "valid", "tiles", "harvests", "annual_yield"):
+            setattr(self, name, getattr(self, name).reshape(-1))
+        for name in ("total_meals", "daily_meals", "supported_people"):
+            setattr(self, name, getattr(self, name).reshape(-1, meal_count))
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __getitem__(self, i: int) -> Optional["FarmResult"]:
+        """第 i 行的 FarmResult，无法种植的行为 None"""
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError(f"批量结果下标越界: {i}（共 {n} 行）")
+        if i < 0:
+            i += n
+        return next(self.iter_results(slice(i, i + 1)))
+
+    def __iter__(self):
+        return self.iter_results()
+
+    @property
+    def nbytes(self) -> int:
+        """各列数组占用的字节数"""
+        columns = (self.crop_ids, self.soil_ids, self.valid, self.tiles, self.harvests,
+                   self.annual_yield, self.total_meals, self.daily_meals, self.supported_people)
+        return sum(col.nbytes for col in columns)
+
+    def iter_results(self, rows: slice = slice(None)):
+        """逐行生成 FarmResult（无法种植的行生成 None），列数据只转换一次"""
+        from calculator import layout_dimensions, optimal_layout  # 避免循环导入
+
+        columns = zip(
+            self.crop_ids[rows].tolist(), self.soil_ids[rows].tolist(),
+            self.valid[rows].tolist(), self.tiles[rows].tolist(),
+            self.harvests[rows].tolist(), self.annual_yield[rows].tolist(),
+            self.total_meals[rows].tolist(), self.daily_meals[rows].tolist(),
+            self.supported_people[rows].tolist(),
+        )
+        for crop_id, soil_id, valid, tiles, harvests, annual_yield, totals, daily, supported in columns:
+            if not valid:
+                yield None
+                continue
+
+            dims = layout_dimensions(tiles)
+            yield FarmResult(
+                crop_name=CROPS_BY_ID[crop_id].name,
+                soil_name=SOILS_BY_ID[soil_id].display,
+                tiles=tiles,
+                harvests=harvests,
+                layout=optimal_layout(tiles),
+                width=dims.width,
+                height=dims.height,
+                padding_tiles=dims.padding_tiles,
+                annual_yield=annual_yield,
+                meal_data={
+                    name: {
+                        "total_meals": totals[j],
+                        "daily_meals": daily[j],
+                        "supported_people": supported[j],
+                    }
+                    for j, name in enumerate(self.meal_names)
+                },
+            )
+
+    def iter_dicts(self, rows: slice = slice(None)):
+        """逐行生成 API 的 JSON 结构，无法种植的行生成 None"""
+        for result in self.iter_results(rows):
+            yield None if result is None else result.to_dict()
+
 
 # === 游戏常量 ===
 YEAR_DAYS = 60  # 游戏年总天数
+MAX_POPULATION = 1000  # 支持的最大殖民者数量
+MAX_TILES = 1_000_000_000  # 反向查询的格数上限，避免批量计算时整数溢出
+
+# === 游戏数据文件 ===
+DATA_FORMAT_VERSION = 1  # 支持的数据文件格式版本
+LOADER_VERSION = 2  # 解析结果的二进制缓存格式（缓存键另含本模块源码哈希，数据类改动会自动失效）
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "game_data.json")
+CACHE_DIR = os.environ.get(
+    "FARM_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+
+@dataclass
+class GameData:
+    """解析并校验后的游戏数据，附带按 ID/名称的索引"""
+    game_version: str
+    crops: List[Crop]
+    soils: List[Soil]
+    meals: Dict[str, MealType]
+    crops_by_id: Dict[int, Crop]
+    crops_by_name: Dict[str, Crop]
+    soils_by_id: Dict[int, Soil]
+    soils_by_name: Dict[str, Soil]
+    soils_by_display: Dict[str, Soil]
+
+
+def _index(items, key, kind):
+    """按 key 建立索引，出现重复值时报错"""
+    index = {}
+    for item in items:
+        value = getattr(item, key)
+        if value in index:
+            raise ValueError(f"{kind}的{key}重复: {value}")
+        index[value] = item
+    return index
+
+
+def _is_number(value) -> bool:
+    """有限的数值；json.loads 会接受 NaN/Infinity，这里一并拒绝"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _check_fields(kind, name, item, ids=(), numbers=(), texts=()):
+    """检查字段类型：ID 为正整数，数值字段为有限数值，文本字段为字符串"""
+    for field in ids:
+        value = getattr(item, field)
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            raise ValueError(f"{kind} {name} 的{field}必须为正整数: {value!r}")
+    for field in numbers:
+        if not _is_number(getattr(item, field)):
+            raise ValueError(f"{kind} {name} 的{field}必须为有限数值: {getattr(item, field)!r}")
+    for field in texts:
+        if not isinstance(getattr(item, field), str):
+            raise ValueError(f"{kind} {name} 的{field}必须为字符串: {getattr(item, field)!r}")
+
+
+def parse_game_data(raw: dict) -> GameData:
+    """校验数据文件内容并建立索引"""
+    if not isinstance(raw, dict):
+        raise ValueError("数据文件顶层必须是对象")
+    version = raw.get("format_version")
+    if version != DATA_FORMAT_VERSION:
+        raise ValueError(f"不支持的数据格式版本: {version}（需要 {DATA_FORMAT_VERSION}）")
+
+    try:
+        soils = [Soil(s["id"], s["name"], s["display"], s["fertility"]) for s in raw["soils"]]
+        crops = [
+            Crop(c["id"], c["name"], c["fertility_sensitivity"], c["base_yield"], c["growth_days"])
+            for c in raw["crops"]
+        ]
+        meals = {name: MealType(m["input"], m["output"]) for name, m in raw["meals"].items()}
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"数据文件缺少字段或格式错误: {e!r}")
+
+    for soil in soils:
+        _check_fields("土地", soil.name, soil, ids=("id",), numbers=("fertility",),
+                      texts=("name", "display"))
+    for crop in crops:
+        _check_fields("作物", crop.name, crop, ids=("id",),
+                      numbers=("fertility_sensitivity", "base_yield"), texts=("name",))
+        if not isinstance(crop.growth_days, dict):
+            raise ValueError(f"作物 {crop.name} 的growth_days必须是 土地名称 -> 天数或null 的对象")
+    for name, meal in meals.items():
+        _check_fields("餐饮", name, meal, numbers=("input", "output"))
+
+    soils_by_name = _index(soils, "name", "土地")
+    for soil in soils:
+        if soil.fertility <= 0:
+            raise ValueError(f"土地 {soil.name} 的肥力必须为正数")
+    for crop in crops:
+        if crop.base_yield <= 0:
+            raise ValueError(f"作物 {crop.name} 的基础产量必须为正数")
+        for soil_name, days in crop.growth_days.items():
+            if soil_name not in soils_by_name:
+                raise ValueError(f"作物 {crop.name} 引用了未知土地: {soil_name}")
+            if days is not None and not _is_number(days):
+                raise ValueError(f"作物 {crop.name} 在{soil_name}上的生长天数必须为有限数值或null: {days!r}")
+            if days is None:
+                continue
+            if days <= 0:
+                raise ValueError(f"作物 {crop.name} 在{soil_name}上的生长天数必须为正数")
+            # 有效肥力 1 + (肥力 - 1) × 敏感度 不为正时产量为零或负数，计算格数会除零或得到负值
+            if 1 + (soils_by_name[soil_name].fertility - 1) * crop.fertility_sensitivity <= 0:
+                raise ValueError(f"作物 {crop.name} 在{soil_name}上的有效肥力必须为正数，"
+                                 f"请检查肥力敏感度 {crop.fertility_sensitivity}")
+    for name, meal in meals.items():
+        if meal.input <= 0 or meal.output <= 0:
+            raise ValueError(f"餐饮 {name} 的食材和营养值必须为正数")
+
+    return GameData(
+        game_version=raw.get("game_version", ""),
+        crops=crops,
+        soils=soils,
+        meals=meals,
+        crops_by_id=_index(crops, "id", "作物"),
+        crops_by_name=_index(crops, "name", "作物"),
+        soils_by_id=_index(soils, "id", "土地"),
+        soils_by_name=soils_by_name,
+        soils_by_display=_index(soils, "display", "土地"),
+    )
+
+
+def _source_digest() -> bytes:
+    """本模块源码的哈希，数据类定义改动后旧缓存不再匹配"""
+    try:
+        with open(__file__, "rb") as f:
+            return hashlib.sha256(f.read()).digest()
+    except OSError:
+        return b""
+
+
+def _read_cache(cache_path: str) -> Optional[GameData]:
+    """
+    读取 pickle 缓存；文件不属于当前用户或可被其他用户写入时不读取，
+    任何读取错误都视为没有缓存。
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            if hasattr(os, "getuid"):
+                st = os.fstat(f.fileno())
+                if st.st_uid != os.getuid() or st.st_mode & 0o022:
+                    return None
+            data = pickle.load(f)
+    except Exception:
+        return None
+    return data if isinstance(data, GameData) else None
+
+
+def load_game_data(path: Optional[str] = None) -> GameData:
+    """
+    读取游戏数据文件（默认 data/game_data.json，可用 FARM_GAME_DATA 指定模组数据）。
+
+    解析和校验结果按文件内容和本模块源码的哈希缓存为 pickle，
+    两者都未改动时后续启动直接读取缓存。
+    """
+    path = path or os.environ.get("FARM_GAME_DATA", DEFAULT_DATA_PATH)
+    with open(path, "rb") as f:
+        content = f.read()
+
+    digest = hashlib.sha256(content + _source_digest()).hexdigest()[:16]
+    cache_path = os.path.join(CACHE_DIR, f"game_data_v{LOADER_VERSION}_{digest}.pickle")
+    data = _read_cache(cache_path)
+    if data is not None:
+        return data
+
+    data = parse_game_data(json.loads(content))
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # 缓存目录不可写时只是每次都重新解析
+    return data
+
+
+GAME_DATA = load_game_data()
+GAME_VERSION = GAME_DATA.game_version
+
+# === 作物、土地、餐饮数据及索引 ===
+CROPS = GAME_DATA.crops
+SOILS = GAME_DATA.soils
+MEALS = GAME_DATA.meals
+CROPS_BY_ID = GAME_DATA.crops_by_id
+CROPS_BY_NAME = GAME_DATA.crops_by_name
+SOILS_BY_ID = GAME_DATA.soils_by_id
+SOILS_BY_NAME = GAME_DATA.soils_by_name
+SOILS_BY_DISPLAY = GAME_DATA.soils_by_display
+
 
-# === 作物数据 ===
-CROPS = [
-    Crop(1, "土豆", 0.4, 11, {"沙砾": 12.17, "普通": 10.71, "肥沃": 9.23, "水培": 6.23}),
-    Crop(2, "玉米", 1.0, 22, {"沙砾": 29.8, "普通": 20.86, "肥沃": 14.9, "水培": None}),
-    Crop(3, "水稻", 1.0, 6, {"沙砾": 7.91, "普通": 5.54, "肥沃": 3.96, "水培": 1.98}),
-]
-
-# === 土地数据 ===
-SOILS = [
-    Soil(1, "沙砾", "沙砾地块", 0.7),
-    Soil(2, "普通", "普通土地", 1.0),
-    Soil(3, "肥沃", "肥沃土地", 1.4),
-    Soil(4, "水培", "水栽培植物盆", 2.8),
-]
-
-# === 餐饮数据 ===
-MEALS = {
-    "简单饭菜": MealType(0.5, 0.9),
-    "营养膏": MealType(0.3, 0.9),
-}
+@lru_cache(maxsize=1)
+def data_fingerprint() -> str:
+    """游戏数据指纹——CROPS/SOILS/MEALS 任何改动都会得到不同的值，用于缓存失效"""
+    payload = json.dumps(
+        {
+            "year_days": YEAR_DAYS,
+            "crops": [asdict(c) for c in CROPS],
+            "soils": [asdict(s) for s in SOILS],
+            "meals": {name: asdict(meal) for name, meal in MEALS.items()},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,205 @@
+"""可选的性能剖析——包装计算函数，统计每次调用耗时并抽样 cProfile，退出时输出火焰图数据
+
+开启方式：环境变量 FARM_PROFILE=1，或在 api.py / main.py / gui.py 后加 --profile。
+    FARM_PROFILE_SAMPLE  用 cProfile 完整剖析的调用比例，默认 0.01（其余调用只计时）
+    FARM_PROFILE_DIR     输出目录，默认当前目录
+
+进程退出时写出：
+    farm_profile_<pid>.collapsed  折叠栈格式，可直接交给 flamegraph.pl / speedscope
+    farm_profile_<pid>.pstats     cProfile 原始数据，可用 pstats / snakeviz 查看
+并在标准错误输出各函数的调用次数和耗时汇总。
+进程池子进程不执行 atexit，用 worker_initializer() 给出的 initializer 安装后，
+各子进程退出时分别写出自己的结果。
+"""
+import atexit
+import cProfile
+import functools
+import multiprocessing.util
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import calculator
+
+# 被包装的 calculator 函数
+TARGETS = ("calculate_farmland", "calculate_farmland_batch", "optimal_layout")
+
+_lock = threading.Lock()
+_local = threading.local()
+_timings: Dict[str, List[float]] = {}  # 函数名 -> [调用次数, 总耗时, 最大耗时]
+_stats: Optional[pstats.Stats] = None
+_installed = False
+_sample_rate = 0.01
+_output_dir = "."
+_PROFILER_DISABLE = "<method 'disable' of '_lsprof.Profiler' objects>"
+
+
+def _record_timing(name: str, elapsed: float):
+    with _lock:
+        entry = _timings.get(name)
+        if entry is None:
+            entry = _timings[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+
+
+def _run_sampled(fn, args, kwargs):
+    """在 cProfile 下执行一次调用，并把结果并入全局统计"""
+    global _stats
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # 已有其他剖析器在运行（如外层的 cProfile），只计时
+        return fn(*args, **kwargs)
+
+    _local.sampling = True
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profile.disable()
+        _local.sampling = False
+        with _lock:
+            if _stats is None:
+                _stats = pstats.Stats(profile)
+            else:
+                _stats.add(profile)
+
+
+def _wrap(fn):
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            if not getattr(_local, "sampling", False) and random.random() < _sample_rate:
+                return _run_sampled(fn, args, kwargs)
+            return fn(*args, **kwargs)
+        finally:
+            _record_timing(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def install(sample_rate: Optional[float] = None, output_dir: Optional[str] = None):
+    """
+    包装 TARGETS 中的函数并注册退出时的输出。
+
+    除 calculator 模块本身外，已经 from calculator import 过这些函数的模块
+    也会被替换，因此可以在入口模块导入完成后再调用。重复调用无效果。
+    """
+    global _installed, _sample_rate, _output_dir
+    if _installed:
+        return
+    _installed = True
+    _sample_rate = float(os.environ.get("FARM_PROFILE_SAMPLE", 0.01)
+                         if sample_rate is None else sample_rate)
+    _output_dir = output_dir or os.environ.get("FARM_PROFILE_DIR", ".")
+
+    for name in TARGETS:
+        original = getattr(calculator, name)
+        wrapped = _wrap(original)
+        for module in list(sys.modules.values()):
+            namespace = getattr(module, "__dict__", None)
+            if namespace is not None and namespace.get(name) is original:
+                namespace[name] = wrapped
+
+    atexit.register(dump)
+
+
+def init_worker(sample_rate: float, output_dir: str):
+    """进程池子进程的 initializer：安装剖析，并在子进程正常退出时写出结果"""
+    global _stats
+    # fork 出的子进程继承了父进程已有的统计，清空后只记录本进程的调用
+    with _lock:
+        _timings.clear()
+        _stats = None
+    install(sample_rate, output_dir)
+    # 只由 Finalize 写出一次：fork 的子进程不执行 atexit，spawn 的子进程两者都会执行
+    atexit.unregister(dump)
+    multiprocessing.util.Finalize(None, dump, exitpriority=10)
+
+
+def worker_initializer():
+    """返回创建进程池时使用的 (initializer, initargs)；未开启剖析时为 (None, ())"""
+    if not _installed:
+        return None, ()
+    return init_worker, (_sample_rate, _output_dir)
+
+
+def _collapsed_stacks(stats: pstats.Stats) -> Dict[str, float]:
+    """
+    由 cProfile 的调用关系图还原折叠栈（微秒）。
+
+    cProfile 只记录“调用者 → 被调用者”一层关系，这里从没有调用者的根函数出发，
+    按各调用者贡献的累计耗时比例向下分摊，递归调用在栈中出现第二次时截断。
+    """
+    raw = stats.stats  # func -> (cc, nc, tottime, cumtime, callers)
+
+    def label(func):
+        filename, line, fn_name = func
+        if filename == "~":
+            return fn_name
+        return f"{fn_name} ({os.path.basename(filename)}:{line})"
+
+    children: Dict[tuple, Dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, caller_stats in callers.items():
+            children.setdefault(caller, {})[func] = caller_stats[3]
+
+    stacks: Dict[str, float] = {}
+
+    def walk(func, path, seen, weight):
+        cumtime = raw[func][3]
+        if cumtime <= 0 or weight <= 0:
+            return
+        ratio = min(weight / cumtime, 1.0)
+        key = ";".join(path)
+        stacks[key] = stacks.get(key, 0.0) + raw[func][2] * ratio * 1e6
+        if len(path) >= 64:
+            return
+        for child, child_cum in children.get(func, {}).items():
+            if child not in seen:
+                walk(child, path + [label(child)], seen | {child}, child_cum * ratio)
+
+    for func, (_, _, _, cumtime, callers) in raw.items():
+        if func[2] == _PROFILER_DISABLE:
+            continue  # 结束剖析本身的记录
+        if not callers or all(caller not in raw for caller in callers):
+            walk(func, [label(func)], {func}, cumtime)
+
+    return stacks
+
+
+def dump():
+    """写出剖析结果并打印耗时汇总"""
+    with _lock:
+        timings = {name: list(entry) for name, entry in _timings.items()}
+        stats = _stats
+
+    if timings:
+        print("\n=== 计算函数耗时 ===", file=sys.stderr)
+        print(f"{'函数':24s}{'调用次数':>10s}{'总耗时(ms)':>14s}{'平均(µs)':>12s}{'最大(µs)':>12s}",
+              file=sys.stderr)
+        for name, (count, total, worst) in sorted(timings.items()):
+            print(f"{name:24s}{count:>10d}{total * 1e3:>14.2f}{total / count * 1e6:>12.1f}"
+                  f"{worst * 1e6:>12.1f}", file=sys.stderr)
+
+    if stats is None:
+        return
+
+    os.makedirs(_output_dir, exist_ok=True)
+    base = os.path.join(_output_dir, f"farm_profile_{os.getpid()}")
+    stats.dump_stats(base + ".pstats")
+    with open(base + ".collapsed", "w", encoding="utf-8") as f:
+        for stack, micros in sorted(_collapsed_stacks(stats).items()):
+            if micros >= 1:
+                f.write(f"{stack} {int(micros)}\n")
+    print(f"剖析数据已写入 {base}.collapsed / .pstats", file=sys.stderr)
@@ -0,0 +1,190 @@
+"""响应缓存——缓存已序列化的 /api/calculate 响应，相同请求直接返回字节
+
+进程内为 LRU + TTL；可选的共享后端让多个 uvicorn worker 共用缓存。
+共享后端用本地 SQLite 文件代替外部缓存服务，无需额外部署。
+缓存键包含游戏数据指纹，数据改动后旧条目不会再被命中。
+异步接口 get_async / set_async 把共享后端的读写放到线程中执行，不阻塞事件循环；
+其他 worker 正占用写锁时只短暂等待，仍拿不到锁就跳过这次写入。
+
+环境变量：
+    FARM_RESPONSE_CACHE_SIZE     进程内最多缓存的响应数，默认 4096，0 表示关闭
+    FARM_RESPONSE_CACHE_TTL      条目有效期（秒），默认 3600
+    FARM_RESPONSE_CACHE_BACKEND  共享后端，"sqlite:<路径>"；不设置时只用进程内缓存
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Optional, Tuple
+
+from models import data_fingerprint
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# 等待其他进程释放 SQLite 锁的最长时间（秒）；缓存写入可以放弃，不值得久等
+BUSY_TIMEOUT = 0.05
+
+
+class SqliteBackend:
+    """多进程共享的缓存后端，条目存在一个 SQLite 文件中"""
+
+    def __init__(self, path: str, maxsize: int, namespace: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.maxsize = maxsize
+        self.namespace = namespace
+        self.writes = 0
+        self.lock = threading.Lock()  # 连接在多个线程间共用
+        # 建表在启动时进行，可以等其他 worker 久一些；之后的读写只短暂等待
+        self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, namespace TEXT NOT NULL,"
+            " body BLOB NOT NULL, expires REAL NOT NULL)")
+        # 其他数据版本留下的条目已经不会再被命中
+        self.conn.execute("DELETE FROM responses WHERE namespace != ?", (namespace,))
+        self.conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """返回 (响应字节, 过期时间)，不存在、已过期或数据库繁忙时返回 None"""
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT body, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        if row is None or row[1] < time.time():
+            return None
+        return row[0], row[1]
+
+    def set(self, key: str, body: bytes, expires: float):
+        """写入一个条目；写锁被其他进程占用时放弃"""
+        try:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, namespace, body, expires)"
+                    " VALUES (?, ?, ?, ?)", (key, self.namespace, body, expires))
+                self.writes += 1
+                if self.writes % 1000 == 0:
+                    self.trim()
+        except sqlite3.OperationalError:
+            pass
+
+    def trim(self):
+        """删除过期条目，并把条目数限制在 maxsize 以内（先删最早过期的）；调用方需持有 lock"""
+        self.conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+        self.conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,))
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+
+
+class ResponseCache:
+    """
+    进程内 LRU + TTL 缓存，可选共享后端作为第二级。
+
+    本地未命中时查询共享后端，命中后写回本地；写入时两级都写。
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600, backend: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = data_fingerprint()
+        self.entries = OrderedDict()  # 键 -> (响应字节, 过期时间)
+        self.hits = 0
+        self.misses = 0
+        self.shared = None
+        if backend:
+            kind, _, target = backend.partition(":")
+            if kind != "sqlite" or not target:
+                raise ValueError(f"不支持的缓存后端: {backend}（可用 sqlite:<路径>）")
+            self.shared = SqliteBackend(target, maxsize * 16, self.namespace)
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """按环境变量创建缓存，大小为 0 时返回 None"""
+        maxsize = int(os.environ.get("FARM_RESPONSE_CACHE_SIZE", 4096))
+        if maxsize <= 0:
+            return None
+        return cls(maxsize=maxsize,
+                   ttl=float(os.environ.get("FARM_RESPONSE_CACHE_TTL", 3600)),
+                   backend=os.environ.get("FARM_RESPONSE_CACHE_BACKEND"))
+
+    def key(self, *parts) -> str:
+        return ":".join([self.namespace, *map(str, parts)])
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self._get_local(key)
+        if body is None and self.shared is not None:
+            body = self._backfill(key, self.shared.get(key))
+        self._count(body)
+        return body
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        """与 get 相同，共享后端的查询在线程中执行"""
+        body = self._get_local(key)
+        if body is None and self.shared is not None:
+            body = self._backfill(key, await asyncio.to_thread(self.shared.get, key))
+        self._count(body)
+        return body
+
+    def set(self, key: str, body: bytes):
+        expires = time.time() + self.ttl
+        self._store(key, body, expires)
+        if self.shared is not None:
+            self.shared.set(key, body, expires)
+
+    async def set_async(self, key: str, body: bytes):
+        """与 set 相同，共享后端的写入在线程中执行"""
+        expires = time.time() + self.ttl
+        self._store(key, body, expires)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, key, body, expires)
+
+    def _get_local(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def _backfill(self, key: str, entry) -> Optional[bytes]:
+        """共享后端命中的条目写回本地"""
+        if entry is None:
+            return None
+        self._store(key, *entry)
+        return entry[0]
+
+    def _count(self, body: Optional[bytes]):
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def _store(self, key: str, body: bytes, expires: float):
+        self.entries[key] = (body, expires)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def cache_info(self) -> CacheInfo:
+        """与 functools.lru_cache 相同格式的统计"""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
@@ -0,0 +1,123 @@
+"""预计算结果表——整个参数空间的计算结果，存为可内存映射的二进制文件"""
+import os
+from typing import Optional
+
+import numpy as np
+
+from models import Crop, Soil, FarmResult, CROPS, SOILS, MEALS, YEAR_DAYS, MAX_POPULATION
+from models import CACHE_DIR, data_fingerprint
+from calculator import calculate_farmland_batch, layout_dimensions, optimal_layout
+
+TABLE_FORMAT_VERSION = 1  # 文件布局变化时递增，旧文件自动失效
+DEFAULT_TABLE_DIR = CACHE_DIR
+
+
+def _table_dtype():
+    # tiles 为 0 表示该组合无法种植；日均和供养人数由 total_meals 现算，不占空间
+    return np.dtype([
+        ("tiles", "<i4"),
+        ("harvests", "<f4"),
+        ("annual_yield", "<f8"),
+        ("total_meals", "<i4", (len(MEALS),)),
+    ])
+
+
+class ResultTable:
+    """按 (作物, 土地, 殖民者数量, 生长期) 索引的结果表，查询为 O(1)"""
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self._crop_index = {c.id: i for i, c in enumerate(CROPS)}
+        self._soil_index = {s.id: i for i, s in enumerate(SOILS)}
+
+    @staticmethod
+    def shape():
+        return (len(CROPS), len(SOILS), MAX_POPULATION, YEAR_DAYS)
+
+    @staticmethod
+    def filename() -> str:
+        return f"farm_table_v{TABLE_FORMAT_VERSION}_{data_fingerprint()}.npy"
+
+    @classmethod
+    def build(cls, path: str) -> "ResultTable":
+        """计算整个参数空间并写入 path（先写临时文件再原子替换）"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        data = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=_table_dtype(), shape=cls.shape())
+
+        populations, days = np.meshgrid(
+            np.arange(1, MAX_POPULATION + 1), np.arange(1, YEAR_DAYS + 1), indexing="ij")
+
+        # 每次只计算一个作物/土地组合，避免一次性占用整个参数空间的内存
+        for ci, crop in enumerate(CROPS):
+            for si, soil in enumerate(SOILS):
+                batch = calculate_farmland_batch(crop.id, soil.id, populations, days)
+                cell = data[ci, si]
+                cell["tiles"] = batch.tiles.reshape(populations.shape)
+                cell["harvests"] = batch.harvests.reshape(populations.shape)
+                cell["annual_yield"] = batch.annual_yield.reshape(populations.shape)
+                cell["total_meals"] = batch.total_meals.reshape(populations.shape + (-1,))
+
+        data.flush()
+        del data
+        os.replace(tmp_path, path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str) -> "ResultTable":
+        """以只读内存映射方式打开结果表"""
+        data = np.load(path, mmap_mode="r")
+        if data.dtype != _table_dtype() or data.shape != cls.shape():
+            raise ValueError(f"结果表格式不匹配: {path}")
+        return cls(data)
+
+    @classmethod
+    def load_or_build(cls, directory: Optional[str] = None) -> "ResultTable":
+        """打开与当前游戏数据匹配的结果表，不存在或已损坏时重新计算"""
+        directory = directory or os.environ.get("FARM_TABLE_DIR", DEFAULT_TABLE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, cls.filename())
+
+        if os.path.exists(path):
+            try:
+                return cls.open(path)
+            except (OSError, ValueError):
+                pass
+        return cls.build(path)
+
+    def lookup(self, crop: Crop, soil: Soil, population: int,
+               growing_days: int) -> Optional[FarmResult]:
+        """查表得到计算结果；组合无法种植或超出表范围时返回 None"""
+        ci = self._crop_index.get(crop.id)
+        si = self._soil_index.get(soil.id)
+        if ci is None or si is None:
+            return None
+        if not (1 <= population <= MAX_POPULATION and 1 <= growing_days <= YEAR_DAYS):
+            return None
+
+        tiles, harvests, annual_yield, total_meals = self.data[
+            ci, si, population - 1, growing_days - 1].item()
+        if tiles == 0:
+            return None
+
+        meal_data = {}
+        for (name, meal), meals_count in zip(MEALS.items(), total_meals.tolist()):
+            meal_data[name] = {
+                "total_meals": meals_count,
+                "daily_meals": round(meals_count / YEAR_DAYS, 1),
+                "supported_people": round(meals_count * meal.output / (1.6 * YEAR_DAYS), 1),
+            }
+
+        dims = layout_dimensions(tiles)
+        return FarmResult(
+            crop_name=crop.name,
+            soil_name=soil.display,
+            tiles=tiles,
+            harvests=harvests,
+            layout=optimal_layout(tiles),
+            width=dims.width,
+            height=dims.height,
+            padding_tiles=dims.padding_tiles,
+            annual_yield=annual_yield,
+            meal_data=meal_data,
+        )
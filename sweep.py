@@ -0,0 +1,149 @@
+"""全参数空间导出——把所有作物 × 土地 × 人数 × 生长期的计算结果写成列式文件
+
+安装了 pyarrow 时写 Parquet（sweep.parquet），否则每列一个可内存映射的
+.npy 文件。输出目录中的 manifest.json 记录列、行数和游戏数据版本。
+每次只计算一个作物/土地组合，内存中最多保留一个分块。
+"""
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import CROPS, SOILS, MEALS, YEAR_DAYS, MAX_POPULATION
+from models import DATA_FORMAT_VERSION, GAME_VERSION, data_fingerprint
+from calculator import calculate_farmland_batch
+
+SWEEP_FORMAT_VERSION = 1  # 列定义变化时递增
+SWEEP_FORMATS = ("parquet", "npy")
+MANIFEST_NAME = "manifest.json"
+PARQUET_NAME = "sweep.parquet"
+
+
+def sweep_columns() -> Dict[str, np.dtype]:
+    """导出的列及其类型（每种餐饮三列，列名以餐饮名开头）"""
+    columns = {
+        "crop_id": np.dtype("<i2"),
+        "soil_id": np.dtype("<i2"),
+        "population": np.dtype("<i4"),
+        "growing_days": np.dtype("<i2"),
+        "valid": np.dtype("?"),
+        "tiles": np.dtype("<i8"),
+        "harvests": np.dtype("<f8"),
+        "annual_yield": np.dtype("<f8"),
+    }
+    for meal_name in MEALS:
+        columns[f"{meal_name}_total_meals"] = np.dtype("<i8")
+        columns[f"{meal_name}_daily_meals"] = np.dtype("<f8")
+        columns[f"{meal_name}_supported_people"] = np.dtype("<f8")
+    return columns
+
+
+def default_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "npy"
+
+
+def iter_chunks(max_population: int = MAX_POPULATION, max_days: int = YEAR_DAYS):
+    """逐个作物/土地组合计算，产出 {列名: 数组}"""
+    populations, days = np.meshgrid(
+        np.arange(1, max_population + 1), np.arange(1, max_days + 1), indexing="ij")
+    populations, days = populations.ravel(), days.ravel()
+
+    for crop in CROPS:
+        for soil in SOILS:
+            batch = calculate_farmland_batch(crop.id, soil.id, populations, days)
+            chunk = {
+                "crop_id": batch.crop_ids,
+                "soil_id": batch.soil_ids,
+                "population": populations,
+                "growing_days": days,
+                "valid": batch.valid,
+                "tiles": batch.tiles,
+                "harvests": batch.harvests,
+                "annual_yield": batch.annual_yield,
+            }
+            for j, meal_name in enumerate(batch.meal_names):
+                chunk[f"{meal_name}_total_meals"] = batch.total_meals[:, j]
+                chunk[f"{meal_name}_daily_meals"] = batch.daily_meals[:, j]
+                chunk[f"{meal_name}_supported_people"] = batch.supported_people[:, j]
+            yield chunk
+
+
+def _write_parquet(out_dir: str, columns: Dict[str, np.dtype], chunks) -> List[str]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.from_numpy_dtype(dtype)) for name, dtype in columns.items()])
+    path = os.path.join(out_dir, PARQUET_NAME)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            arrays = [pa.array(chunk[name].astype(dtype, copy=False))
+                      for name, dtype in columns.items()]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    return [PARQUET_NAME]
+
+
+def _write_npy(out_dir: str, columns: Dict[str, np.dtype], chunks, rows: int) -> List[str]:
+    files = {name: f"{name}.npy" for name in columns}
+    outputs = {
+        name: np.lib.format.open_memmap(
+            os.path.join(out_dir, files[name]), mode="w+", dtype=dtype, shape=(rows,))
+        for name, dtype in columns.items()
+    }
+
+    start = 0
+    for chunk in chunks:
+        stop = start + len(chunk["tiles"])
+        for name, column in outputs.items():
+            column[start:stop] = chunk[name]
+        start = stop
+
+    for column in outputs.values():
+        column.flush()
+    return list(files.values())
+
+
+def export_sweep(out_dir: str, fmt: Optional[str] = None,
+                 max_population: int = MAX_POPULATION, max_days: int = YEAR_DAYS) -> dict:
+    """导出全参数空间到 out_dir，返回写入的 manifest"""
+    fmt = fmt or default_format()
+    if fmt not in SWEEP_FORMATS:
+        raise ValueError(f"未知导出格式: {fmt}，可选 {', '.join(SWEEP_FORMATS)}")
+    if max_population < 1 or max_days < 1:
+        raise ValueError("人数和生长期上限必须为正整数")
+
+    os.makedirs(out_dir, exist_ok=True)
+    columns = sweep_columns()
+    rows = len(CROPS) * len(SOILS) * max_population * max_days
+    chunks = iter_chunks(max_population, max_days)
+
+    start = time.perf_counter()
+    if fmt == "parquet":
+        files = _write_parquet(out_dir, columns, chunks)
+    else:
+        files = _write_npy(out_dir, columns, chunks, rows)
+
+    manifest = {
+        "sweep_format_version": SWEEP_FORMAT_VERSION,
+        "format": fmt,
+        "files": files,
+        "rows": rows,
+        "columns": {name: dtype.str for name, dtype in columns.items()},
+        "order": ["crop_id", "soil_id", "population", "growing_days"],
+        "crop_ids": [c.id for c in CROPS],
+        "soil_ids": [s.id for s in SOILS],
+        "population_range": [1, max_population],
+        "growing_days_range": [1, max_days],
+        "game_version": GAME_VERSION,
+        "data_format_version": DATA_FORMAT_VERSION,
+        "data_fingerprint": data_fingerprint(),
+        "elapsed_seconds": round(time.perf_counter() - start, 3),
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
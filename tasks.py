@@ -0,0 +1,154 @@
+"""可在进程池中执行的重计算任务——只依赖 models/calculator，子进程导入开销小"""
+from typing import Dict, List, Optional, Tuple
+
+import json_codec
+from models import CROPS_BY_ID, SOILS_BY_ID, MAX_POPULATION, MAX_TILES, YEAR_DAYS
+from calculator import (
+    calculate_farmland_batch, crop_yield, max_population_batch, plan_portfolio, rank_farmland,
+    tiles_needed, validate_planting,
+)
+from json_codec import OptimizeOption, OptimizeResponse
+
+
+def _item_error(crop_id: int, soil_id: int, growing_days: int) -> str:
+    """批量计算中无效项的原因"""
+    crop = CROPS_BY_ID.get(crop_id)
+    soil = SOILS_BY_ID.get(soil_id)
+    if crop is None:
+        return f"作物ID {crop_id} 不存在"
+    if soil is None:
+        return f"土地ID {soil_id} 不存在"
+    try:
+        validate_planting(crop, soil, growing_days)
+    except ValueError as e:
+        return str(e)
+    return "无法计算"
+
+
+def _range_error(crop_id: int, soil_id: int, population: int, growing_days: int) -> Optional[str]:
+    """超出 /api/calculate 和交互菜单允许范围的参数，返回原因；都在范围内时返回 None"""
+    if not 1 <= population <= MAX_POPULATION:
+        return f"殖民者数量必须在1到{MAX_POPULATION}之间，当前为{population}"
+    return _common_range_error(crop_id, soil_id, growing_days)
+
+
+def _tiles_range_error(crop_id: int, soil_id: int, tiles: int, growing_days: int) -> Optional[str]:
+    """超出 /api/max-population 允许范围的参数，返回原因"""
+    if not 0 <= tiles <= MAX_TILES:
+        return f"格数必须在0到{MAX_TILES}之间，当前为{tiles}"
+    return _common_range_error(crop_id, soil_id, growing_days)
+
+
+def _common_range_error(crop_id: int, soil_id: int, growing_days: int) -> Optional[str]:
+    if crop_id not in CROPS_BY_ID:
+        return f"作物ID {crop_id} 不存在"
+    if soil_id not in SOILS_BY_ID:
+        return f"土地ID {soil_id} 不存在"
+    if not 1 <= growing_days <= YEAR_DAYS:
+        return f"生长期天数必须在1到{YEAR_DAYS}之间，当前为{growing_days}"
+    return None
+
+
+def _with_range_errors(items, range_error, calculate) -> List[dict]:
+    """越界的项直接给出错误，其余项交给 calculate 计算，按输入顺序合并"""
+    errors = [range_error(*item) for item in items]
+    computed = iter(calculate([item for item, error in zip(items, errors) if error is None]))
+    return [
+        next(computed) if error is None else {"result": None, "error": error}
+        for error in errors
+    ]
+
+
+def calculate_batch(items: List[Tuple[int, int, int, int]]) -> List[dict]:
+    """
+    批量计算 (crop_id, soil_id, population, growing_days) 场景。
+
+    按输入顺序返回 {"result": ..., "error": None} 或
+    {"result": None, "error": "原因"}，result 与 /api/calculate 的返回格式相同。
+    超出允许范围的参数不参与计算，原因同样内联在 error 中。
+    """
+    return _with_range_errors(items, _range_error, _calculate_in_range)
+
+
+def _calculate_in_range(items: List[Tuple[int, int, int, int]]) -> List[dict]:
+    if not items:
+        return []
+    crop_ids, soil_ids, populations, growing_days = zip(*items)
+    batch = calculate_farmland_batch(crop_ids, soil_ids, populations, growing_days)
+
+    results = []
+    for k, row in enumerate(batch.iter_dicts()):
+        if row is not None:
+            results.append({"result": row, "error": None})
+        else:
+            error = _item_error(crop_ids[k], soil_ids[k], growing_days[k])
+            results.append({"result": None, "error": error})
+
+    return results
+
+
+def sweep_lines(items: List[Tuple[int, int, int, int]], sse: bool) -> bytes:
+    """计算一段扫描场景，编码为 NDJSON 行（sse=True 时为 SSE 事件），在子进程中完成编码"""
+    lines = []
+    for (_, _, population, growing_days), item in zip(items, calculate_batch(items)):
+        row = json_codec.dumps({"population": population, "growing_days": growing_days, **item})
+        lines.append(b"data: " + row + b"\n\n" if sse else row + b"\n")
+    return b"".join(lines)
+
+
+def optimize_body(population: int, growing_days: int, rank_by: str, meal: Optional[str],
+                  tiles_weight: float, surplus_weight: float) -> bytes:
+    """/api/optimize 的响应体；参数无效时抛出 ValueError"""
+    options = rank_farmland(population, growing_days, rank_by, meal, tiles_weight, surplus_weight)
+    return json_codec.dumps(OptimizeResponse(
+        rank_by, [OptimizeOption.from_option(option) for option in options]))
+
+
+def portfolio_body(budgets: Dict[int, int], population: int, growing_days: int,
+                   objective: str) -> bytes:
+    """/api/portfolio 的响应体；参数无效时抛出 ValueError"""
+    return json_codec.dumps(plan_portfolio(budgets, population, growing_days, objective).to_dict())
+
+
+def max_population_result(crop_id: int, soil_id: int, tiles: int, growing_days: int,
+                          population: int, annual_yield: float) -> dict:
+    """/api/max-population 的返回格式"""
+    return {
+        "crop_name": CROPS_BY_ID[crop_id].name,
+        "soil_name": SOILS_BY_ID[soil_id].display,
+        "tiles": tiles,
+        "growing_days": growing_days,
+        "max_population": population,
+        "tiles_needed": tiles_needed(population, annual_yield) if population else 0,
+    }
+
+
+def max_population_items(items: List[Tuple[int, int, int, int]]) -> List[dict]:
+    """
+    批量计算 (crop_id, soil_id, tiles, growing_days) 最多能养活的人数。
+
+    按输入顺序返回 {"result": ..., "error": None} 或 {"result": None, "error": "原因"}；
+    超出允许范围的参数不参与计算，原因同样内联在 error 中。
+    """
+    return _with_range_errors(items, _tiles_range_error, _max_population_in_range)
+
+
+def _max_population_in_range(items: List[Tuple[int, int, int, int]]) -> List[dict]:
+    if not items:
+        return []
+    crop_ids, soil_ids, tiles, growing_days = zip(*items)
+    populations, valid = max_population_batch(crop_ids, soil_ids, tiles, growing_days)
+
+    results = []
+    for k, (population, ok) in enumerate(zip(populations.tolist(), valid.tolist())):
+        if not ok:
+            error = _item_error(crop_ids[k], soil_ids[k], growing_days[k])
+            results.append({"result": None, "error": error})
+            continue
+        _, annual_yield = crop_yield(
+            CROPS_BY_ID[crop_ids[k]], SOILS_BY_ID[soil_ids[k]], growing_days[k])
+        result = max_population_result(
+            crop_ids[k], soil_ids[k], tiles[k], growing_days[k], population, annual_yield)
+        results.append({"result": result, "error": None})
+
+    return results
@@ -0,0 +1,103 @@
+"""重计算任务的进程池——限制排队深度，满载时直接拒绝而不是无限排队"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import profiling
+
+
+class PoolSaturated(Exception):
+    """进程池已满，调用方应返回 429 让客户端稍后重试"""
+
+
+class PoolUnavailable(Exception):
+    """子进程异常退出导致进程池损坏，调用方应返回 503；下次调用会重建进程池"""
+
+
+def default_workers() -> int:
+    """
+    默认进程数：CPU 核数按 uvicorn worker 数均分。
+
+    uvicorn 的 --workers 默认取自 WEB_CONCURRENCY，多 worker 部署时应通过
+    该变量（或直接设置 FARM_POOL_WORKERS）告知 worker 数，否则每个 worker
+    都会按全部核数启动子进程。
+    """
+    uvicorn_workers = max(int(os.environ.get("WEB_CONCURRENCY", 1)), 1)
+    return max((os.cpu_count() or 1) // uvicorn_workers, 1)
+
+
+class BoundedProcessPool:
+    """
+    带排队上限的进程池。
+
+    run() 必须在事件循环线程中调用；进行中（含排队）的任务数达到
+    max_pending 时抛出 PoolSaturated。任务在子进程中真正结束后才释放名额，
+    调用方被取消（如客户端断开）时仍在运行的任务继续计数。
+    进程池在首次使用时才创建，子进程用 spawn 启动，不从多线程的服务进程 fork。
+    子进程异常退出（如被 OOM killer 杀掉）时抛出 PoolUnavailable 并丢弃损坏的进程池，
+    下一次调用重新创建。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.max_workers = max_workers or int(
+            os.environ.get("FARM_POOL_WORKERS", default_workers()))
+        self.max_pending = max_pending or int(
+            os.environ.get("FARM_POOL_MAX_PENDING", self.max_workers * 4))
+        self.pending = 0
+        self._executor = None
+
+    @property
+    def saturated(self) -> bool:
+        """进行中的任务数是否已达到上限"""
+        return self.pending >= self.max_pending
+
+    async def run(self, fn, *args):
+        """在进程池中执行 fn(*args) 并等待结果"""
+        if self.saturated:
+            raise PoolSaturated(f"已有{self.pending}个任务在处理，请稍后重试")
+
+        if self._executor is None:
+            # 开启了剖析时子进程同样剖析，各自退出时写出结果
+            initializer, initargs = profiling.worker_initializer()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer, initargs=initargs)
+
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            raise PoolUnavailable("计算进程异常退出，请稍后重试") from e
+        self.pending += 1
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                pass  # 事件循环已关闭
+
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            raise PoolUnavailable("计算进程异常退出，请稍后重试") from e
+
+    def _release(self):
+        self.pending -= 1
+
+    def _discard(self, executor):
+        """丢弃已损坏的进程池；并发的多个任务同时失败时只丢弃一次，不影响已重建的新池"""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None